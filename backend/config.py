@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     client_url: str
@@ -7,7 +8,67 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
-    gemini_api_key: str
+    gemini_api_key: str = ""
+    gemini_model: str = "gemini-2.5-flash"
+    gemini_requests_per_minute: int = 60
+    gemini_tokens_per_minute: int = 1000000
+    gemini_use_async: bool = True
+    gemini_executor_workers: int = 32
+    llm_backend: str = "gemini"
+    llm_retry_max_attempts: int = 4
+    llm_retry_base_delay: float = 0.5
+    llm_retry_max_delay: float = 20.0
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+    llm_hedging_enabled: bool = True
+    llm_hedge_percentile: float = 95
+    llm_hedge_max_ratio: float = 0.1
+    llm_hedge_min_samples: int = 20
+    stub_latency_distribution: str = "lognormal"
+    stub_latency_ms: float = 800
+    stub_latency_jitter: float = 0.5
+    stub_tokens_per_second: float = 80
+    stub_failure_rate: float = 0.0
+    stub_failure_status: int = 503
+    stub_seed: Optional[int] = None
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 1000
+    llm_cache_ttl_seconds: int = 86400
+    llm_cache_path: Optional[str] = None
+    outline_cache_max_entries: int = 500
+    outline_cache_ttl_seconds: int = 86400
+    generation_concurrency: int = 4
+    single_call_max_sections: int = 8
+    long_section_threshold_words: int = 1200
+    long_section_chunk_words: int = 500
+    long_section_concurrency: int = 8
+    max_section_words: int = 5000
+    batch_max_sections: int = 20
+    batch_refine_concurrency: int = 8
+    preview_max_entries: int = 1000
+    preview_ttl_seconds: float = 1800.0
+    refinement_keyframe_interval: int = 10
+    page_size_default: int = 50
+    page_size_max: int = 200
+    detail_embed_limit: int = 10
+    feedback_write_behind: bool = False
+    feedback_queue_size: int = 10000
+    feedback_batch_size: int = 200
+    feedback_flush_interval: float = 1.0
+    feedback_flush_retries: int = 2
+    feedback_flush_retry_delay: float = 0.5
+    speculation_ttl_seconds: float = 120.0
+    speculation_max_outlines: int = 50
+    speculation_max_sections: int = 15
+    speculation_concurrency: int = 4
+    speculation_adopt_wait_fraction: float = 0.25
+    generation_budget_seconds: float = 120.0
+    section_summary_max_words: int = 40
+    context_token_budget: int = 400
+    generation_max_budget_seconds: float = 600.0
+    job_backend: str = "inprocess"
+    job_workers: int = 2
+    job_retention_seconds: int = 3600
 
     class Config:
         env_file = ".env"
@@ -1,8 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from database import engine, Base
 from routers import auth, projects, generation, refinement, export, sections
 from config import get_settings
+from services.gemini_service import gemini_service
+from services.generation_pipeline import generation_jobs
+from services.speculation import speculative_generations
+from services.preview_store import refinement_previews
+from services.feedback_writer import feedback_writer
+from services.resilience import CircuitOpenError
+from services.deadline import DeadlineExceeded
 
 settings = get_settings()
 
@@ -22,6 +30,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Generation-Partial"],
 )
 
 # Include routers
@@ -32,6 +41,29 @@ app.include_router(refinement.router)
 app.include_router(sections.router)
 app.include_router(export.router)
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # Fail fast while the LLM upstream is down instead of queueing doomed calls
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(int(exc.retry_after + 0.5))}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": str(exc)}
+    )
+
+@app.on_event("shutdown")
+async def shutdown():
+    await generation_jobs.stop()
+    await feedback_writer.stop()
+    speculative_generations.shutdown()
+    gemini_service.backend.shutdown()
+
 @app.get("/")
 async def root():
     return {"message": "AI Document API", "status": "active", "version": "1.0.0"}
@@ -40,3 +72,12 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "gemini": gemini_service.stats(),
+        "jobs": generation_jobs.stats(),
+        "speculation": speculative_generations.stats(),
+        "refinement_previews": refinement_previews.stats(),
+        "feedback_writer": feedback_writer.stats()
+    }
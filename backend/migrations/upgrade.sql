@@ -0,0 +1,74 @@
+-- Brings a database created by an earlier release up to the current models.
+--
+-- Base.metadata.create_all only creates missing tables, so columns and
+-- indexes added to existing tables have to be applied here. Every statement
+-- is idempotent; run it before starting the new backend:
+--
+--     psql "$DATABASE_URL" -f migrations/upgrade.sql
+
+BEGIN;
+
+-- Section summaries (used as context for other sections) and staleness flag
+ALTER TABLE sections ADD COLUMN IF NOT EXISTS summary TEXT;
+ALTER TABLE sections ADD COLUMN IF NOT EXISTS is_stale BOOLEAN NOT NULL DEFAULT false;
+
+-- Refinement history stored as keyframes plus compressed deltas; rows written
+-- before this keep their full previous_content/new_content and are read as keyframes
+ALTER TABLE refinements ALTER COLUMN previous_content DROP NOT NULL;
+ALTER TABLE refinements ALTER COLUMN new_content DROP NOT NULL;
+ALTER TABLE refinements ADD COLUMN IF NOT EXISTS previous_delta BYTEA;
+ALTER TABLE refinements ADD COLUMN IF NOT EXISTS new_delta BYTEA;
+ALTER TABLE refinements ADD COLUMN IF NOT EXISTS content_size INTEGER;
+ALTER TABLE refinements ADD COLUMN IF NOT EXISTS keyframe BOOLEAN NOT NULL DEFAULT false;
+UPDATE refinements SET content_size = length(new_content)
+    WHERE content_size IS NULL AND new_content IS NOT NULL;
+UPDATE refinements SET keyframe = true
+    WHERE NOT keyframe AND previous_content IS NOT NULL;
+
+-- Keyset pagination of refinement and feedback listings
+CREATE INDEX IF NOT EXISTS ix_refinements_section_created ON refinements (section_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_feedback_section_created ON feedback (section_id, created_at, id);
+
+-- Feedback counters
+ALTER TABLE sections ADD COLUMN IF NOT EXISTS like_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sections ADD COLUMN IF NOT EXISTS dislike_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE sections ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS like_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS dislike_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0;
+
+-- Recompute the counters from the feedback rows (safe to re-run). The enum
+-- column stores member names, as SQLAlchemy's Enum type does by default.
+UPDATE sections SET
+    like_count = totals.like_count,
+    dislike_count = totals.dislike_count,
+    comment_count = totals.comment_count
+FROM (
+    SELECT
+        s.id AS section_id,
+        count(f.id) FILTER (WHERE f.feedback_type = 'LIKE') AS like_count,
+        count(f.id) FILTER (WHERE f.feedback_type = 'DISLIKE') AS dislike_count,
+        count(f.id) FILTER (WHERE trim(both E' \t\r\n' FROM coalesce(f.comment, '')) <> '') AS comment_count
+    FROM sections s
+    LEFT JOIN feedback f ON f.section_id = s.id
+    GROUP BY s.id
+) AS totals
+WHERE sections.id = totals.section_id;
+
+UPDATE projects SET
+    like_count = totals.like_count,
+    dislike_count = totals.dislike_count,
+    comment_count = totals.comment_count
+FROM (
+    SELECT
+        p.id AS project_id,
+        coalesce(sum(s.like_count), 0) AS like_count,
+        coalesce(sum(s.dislike_count), 0) AS dislike_count,
+        coalesce(sum(s.comment_count), 0) AS comment_count
+    FROM projects p
+    LEFT JOIN sections s ON s.project_id = p.id
+    GROUP BY p.id
+) AS totals
+WHERE projects.id = totals.project_id;
+
+COMMIT;
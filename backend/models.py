@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -33,6 +33,10 @@ class Project(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Feedback totals, kept current by services.feedback_stats as feedback is added
+    like_count = Column(Integer, default=0, server_default="0", nullable=False)
+    dislike_count = Column(Integer, default=0, server_default="0", nullable=False)
+    comment_count = Column(Integer, default=0, server_default="0", nullable=False)
     
     owner = relationship("User", back_populates="projects")
     sections = relationship("Section", back_populates="project", cascade="all, delete-orphan", order_by="Section.order")
@@ -43,6 +47,14 @@ class Section(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=True)
+    # Extractive summary of content, used as context for other sections
+    summary = Column(Text, nullable=True)
+    # Set when the title or topic changes after content was generated
+    is_stale = Column(Boolean, default=False, nullable=False)
+    # Feedback totals, kept current by services.feedback_stats as feedback is added
+    like_count = Column(Integer, default=0, server_default="0", nullable=False)
+    dislike_count = Column(Integer, default=0, server_default="0", nullable=False)
+    comment_count = Column(Integer, default=0, server_default="0", nullable=False)
     order = Column(Integer, nullable=False)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -54,11 +66,20 @@ class Section(Base):
 
 class Refinement(Base):
     __tablename__ = "refinements"
+    # Keyset pagination walks a section's history newest first
+    __table_args__ = (Index("ix_refinements_section_created", "section_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     prompt = Column(Text, nullable=False)
-    previous_content = Column(Text, nullable=False)
-    new_content = Column(Text, nullable=False)
+    # Full text only on rows written before delta storage; newer rows keep
+    # zlib-compressed deltas (or, on keyframes, the full previous content in
+    # previous_delta) that services.refinement_history decodes
+    previous_content = Column(Text, nullable=True)
+    new_content = Column(Text, nullable=True)
+    previous_delta = Column(LargeBinary, nullable=True)
+    new_delta = Column(LargeBinary, nullable=True)
+    keyframe = Column(Boolean, default=False, server_default="false", nullable=False)
+    content_size = Column(Integer, nullable=True)
     section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -66,6 +87,7 @@ class Refinement(Base):
 
 class Feedback(Base):
     __tablename__ = "feedback"
+    __table_args__ = (Index("ix_feedback_section_created", "section_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     feedback_type = Column(SQLEnum(FeedbackType), nullable=True)
@@ -1,24 +1,238 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Dict, List, AsyncIterator, Awaitable, Callable, Optional, TypeVar
 import asyncio
+import json
 from database import get_db
 from models import Project, Section, User
-from schemas import ProjectResponse, SectionResponse
+from schemas import (
+    ProjectResponse,
+    SectionResponse,
+    JobResponse,
+    BatchGenerateRequest,
+    BatchGenerateResponse
+)
 from auth import get_current_user
+from config import get_settings
 from services.gemini_service import gemini_service
+from services.generation_pipeline import (
+    generate_sections,
+    generation_jobs,
+    context_source,
+    plan_sections,
+    section_word_count,
+    SectionPlan,
+    validate_generation_mode,
+    validate_word_count
+)
+from services.jobs import Job, JOB_COMPLETED, JOB_FAILED
+from services.speculation import speculative_generations
+from services.resilience import CircuitOpenError
+from services.deadline import DeadlineExceeded, deadline_scope
+from services.summarizer import set_section_content
+
+settings = get_settings()
+
+T = TypeVar("T")
 
 router = APIRouter(prefix="/generation", tags=["generation"])
 
+# How often a long request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Non-standard status (from nginx) for a request the client abandoned
+CLIENT_CLOSED_REQUEST = 499
+
+def _request_budget(budget_seconds: Optional[float]) -> float:
+    """
+    Time budget for a request's LLM work, capped by the server maximum
+    """
+    if budget_seconds is not None and budget_seconds <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="budget_seconds must be positive"
+        )
+    budget = budget_seconds if budget_seconds is not None else settings.generation_budget_seconds
+    return min(budget, settings.generation_max_budget_seconds)
+
+async def _cancel_on_disconnect(request: Request, fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    Await `fn()`, cancelling it if the client disconnects first so no more
+    tokens are spent on a response nobody will read
+    """
+    task = asyncio.ensure_future(fn())
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(
+                    status_code=CLIENT_CLOSED_REQUEST,
+                    detail="Client disconnected"
+                )
+    finally:
+        if not task.done():
+            task.cancel()
+
+def _sse_event(event: str, data: dict) -> str:
+    """
+    Format a server-sent event
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _prefetched_sections(
+    user_id: int,
+    topic: str,
+    document_type: str,
+    plans: List[SectionPlan],
+    resume: bool,
+    word_count: Optional[int]
+) -> Dict[int, str]:
+    """
+    Adopt speculative content for the sections about to be generated,
+    unless the caller wants a custom length
+
+    Speculative content never comes from the response cache, so it is
+    adopted for fresh generations too.
+    """
+    if word_count is not None:
+        speculative_generations.discard(user_id, topic, document_type)
+        return {}
+    return await speculative_generations.adopt(
+        user_id,
+        topic,
+        document_type,
+        [plan.title for plan in plans],
+        [idx for idx, plan in enumerate(plans) if not resume or plan.needs_generation]
+    )
+
+async def _stream_sections(
+    db: Session,
+    user_id: int,
+    project: Project,
+    mode: str,
+    use_cache: bool = True,
+    budget_seconds: Optional[float] = None,
+    resume: bool = False,
+    word_count: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Generate sections through the shared pipeline and yield SSE events as content arrives
+
+    Events: section_start, chunk (cleaned text delta), section_complete
+    (section saved), error, and a final done. If the time budget runs out,
+    done is sent with partial=true and the unfinished sections are left as is.
+    With resume=True sections that already have content are skipped.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    topic = project.topic
+    document_type = project.document_type.value
+    sections_by_id = {section.id: section for section in project.sections}
+    plans = plan_sections(project.sections)
+
+    async def on_start(plan: SectionPlan):
+        await events.put(_sse_event("section_start", {
+            "section_id": plan.id,
+            "title": plan.title,
+            "order": plan.order
+        }))
+
+    async def on_chunk(plan: SectionPlan, chunk: str):
+        await events.put(_sse_event("chunk", {"section_id": plan.id, "text": chunk}))
+
+    async def on_complete(plan: SectionPlan, content: str):
+        section = sections_by_id[plan.id]
+        set_section_content(section, content)
+        section.is_stale = False
+        db.commit()
+        await events.put(_sse_event("section_complete", {
+            "section_id": plan.id,
+            "order": plan.order,
+            "content": content
+        }))
+
+    async def produce():
+        try:
+            with deadline_scope(budget_seconds):
+                prefetched = await _prefetched_sections(
+                    user_id, topic, document_type, plans, resume, word_count
+                )
+                contents = await generate_sections(
+                    topic=topic,
+                    document_type=document_type,
+                    sections=plans,
+                    mode=mode,
+                    use_cache=use_cache,
+                    on_section_start=on_start,
+                    on_section_complete=on_complete,
+                    on_section_chunk=on_chunk,
+                    resume=resume,
+                    word_count=word_count,
+                    prefetched=prefetched
+                )
+            await events.put(_sse_event("done", {"project_id": project.id, "partial": None in contents}))
+        except DeadlineExceeded:
+            db.rollback()
+            await events.put(_sse_event("done", {"project_id": project.id, "partial": True}))
+        except Exception as e:
+            db.rollback()
+            await events.put(_sse_event("error", {"detail": str(e)}))
+        finally:
+            await events.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        # Client went away (or we finished): stop any remaining generation
+        producer.cancel()
+
 @router.post("/projects/{project_id}/generate", response_model=ProjectResponse)
 async def generate_project_content(
     project_id: int,
+    request: Request,
+    response: Response,
+    mode: str = "sequential",
+    fresh: bool = True,
+    resume: bool = False,
+    word_count: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Generate AI content for all sections of a project
+
+    In "sequential" mode each section sees the content of the sections before it.
+    In "concurrent" mode sections are generated in parallel from the outline.
+    In "single_call" mode the whole outline is written by one request and only
+    sections that come back missing or malformed are re-requested.
+    Cached LLM responses are skipped (re-running generation should give new
+    text) unless fresh=false.
+
+    Each section is saved as soon as it is generated, so a failure keeps the
+    finished ones. Pass resume=true to generate only sections that are empty
+    or stale, using the stored sections as context.
+
+    Content speculatively generated for sections with the same position and title after
+    /outline/generate?speculative=true is adopted instead of regenerated
+    (not with a custom word_count).
+
+    word_count overrides the per-section length; long docx sections are
+    planned into sub-points and written in concurrent chunks.
+
+    All LLM calls share a time budget (budget_seconds). Sections not finished
+    when it runs out keep their old content and the response carries
+    X-Generation-Partial: true. Generation stops if the client disconnects.
     """
+    budget = _request_budget(budget_seconds)
+    
     # Get project with sections
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -38,55 +252,373 @@ async def generate_project_content(
             detail="Project has no sections to generate content for"
         )
     
-    # Sort sections by order
-    sections = sorted(project.sections, key=lambda x: x.order)
+    plans = plan_sections(project.sections)
+    pending_count = sum(1 for plan in plans if not resume or plan.needs_generation)
+    
+    mode_error = validate_word_count(word_count) or validate_generation_mode(mode, pending_count, word_count)
+    if mode_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mode_error
+        )
     
-    # Generate content for each section
-    context = ""  # Build context from previous sections
+    sections_by_id = {section.id: section for section in project.sections}
     
-    for section in sections:
-        try:
-            # Generate content with context from previous sections
-            content = await gemini_service.generate_section_content(
+    async def save_section(plan, content: str):
+        # Commit each section as it lands so a later failure keeps it
+        section = sections_by_id[plan.id]
+        set_section_content(section, content)
+        section.is_stale = False
+        db.commit()
+    
+    topic = project.topic
+    document_type = project.document_type.value
+    
+    async def run_generation() -> List[Optional[str]]:
+        prefetched = await _prefetched_sections(
+            current_user.id, topic, document_type, plans, resume, word_count
+        )
+        return await generate_sections(
+            topic=topic,
+            document_type=document_type,
+            sections=plans,
+            mode=mode,
+            use_cache=not fresh,
+            on_section_complete=save_section,
+            resume=resume,
+            word_count=word_count,
+            prefetched=prefetched
+        )
+    
+    try:
+        with deadline_scope(budget):
+            contents = await _cancel_on_disconnect(request, run_generation)
+    except (CircuitOpenError, HTTPException):
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    
+    response.headers["X-Generation-Partial"] = "true" if None in contents else "false"
+    
+    db.refresh(project)
+    
+    return project
+
+@router.post("/projects/{project_id}/generate/stream")
+async def stream_project_content(
+    project_id: int,
+    mode: str = "sequential",
+    fresh: bool = True,
+    resume: bool = False,
+    word_count: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Generate AI content for all sections of a project as a server-sent event stream
+
+    Runs the same pipeline as /generate (modes, speculative content,
+    word_count and long sections, cached responses skipped unless
+    fresh=false), streaming each section's text as it arrives. Each section
+    is saved as soon as it completes. Pass resume=true to generate only
+    sections that are empty or stale. Generation stops when
+    the time budget (budget_seconds) runs out or the client disconnects.
+    """
+    budget = _request_budget(budget_seconds)
+    
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    if not project.sections:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Project has no sections to generate content for"
+        )
+    
+    pending_count = sum(
+        1 for plan in plan_sections(project.sections)
+        if not resume or plan.needs_generation
+    )
+    mode_error = validate_word_count(word_count) or validate_generation_mode(mode, pending_count, word_count)
+    if mode_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mode_error
+        )
+    
+    return StreamingResponse(
+        _stream_sections(
+            db, current_user.id, project, mode,
+            use_cache=not fresh,
+            budget_seconds=budget,
+            resume=resume,
+            word_count=word_count
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post(
+    "/projects/{project_id}/jobs",
+    response_model=JobResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_generation_job(
+    project_id: int,
+    mode: str = "sequential",
+    fresh: bool = True,
+    resume: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue generation of all sections of a project as a background job
+
+    Pass resume=true to generate only sections that are empty or stale.
+    Cached LLM responses are skipped unless fresh=false.
+    """
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    if not project.sections:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Project has no sections to generate content for"
+        )
+    
+    pending_count = sum(
+        1 for plan in plan_sections(project.sections)
+        if not resume or plan.needs_generation
+    )
+    mode_error = validate_generation_mode(mode, pending_count)
+    if mode_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=mode_error
+        )
+    
+    job = Job(
+        user_id=current_user.id,
+        project_id=project.id,
+        mode=mode,
+        sections=[(section.id, section.title, section.order) for section in project.sections],
+        fresh=fresh,
+        resume=resume
+    )
+    await generation_jobs.submit(job)
+    
+    return job.to_dict()
+
+def _get_user_job(job_id: str, current_user: User) -> Job:
+    job = generation_jobs.get(job_id)
+    
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return job
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_generation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the status and per-section progress of a generation job
+    """
+    return _get_user_job(job_id, current_user).to_dict()
+
+async def _stream_job_events(job: Job) -> AsyncIterator[str]:
+    queue = job.subscribe()
+    try:
+        # Current state first, so late subscribers don't miss earlier progress
+        yield _sse_event("snapshot", JobResponse(**job.to_dict()).model_dump(mode="json"))
+        
+        if job.finished:
+            return
+        
+        while True:
+            event = await queue.get()
+            yield _sse_event(event["event"], event["data"])
+            if event["event"] in (JOB_COMPLETED, JOB_FAILED):
+                break
+    finally:
+        job.unsubscribe(queue)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_generation_job_events(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Follow a generation job's progress as a server-sent event stream
+    """
+    job = _get_user_job(job_id, current_user)
+    
+    return StreamingResponse(
+        _stream_job_events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/projects/{project_id}/generate/batch", response_model=BatchGenerateResponse)
+async def generate_sections_batch(
+    project_id: int,
+    batch: BatchGenerateRequest,
+    request: Request,
+    fresh: bool = True,
+    word_count: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Regenerate several sections of a project in one request
+
+    Sections are generated concurrently under the shared rate limit, with
+    the rest of the document as context, and all successful results are
+    saved in one transaction. Each section's outcome is reported separately.
+    Regenerating bypasses cached LLM responses unless fresh=false.
+    """
+    budget = _request_budget(budget_seconds)
+    
+    section_ids = list(dict.fromkeys(batch.section_ids))
+    if not section_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No sections given"
+        )
+    if len(section_ids) > settings.batch_max_sections:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.batch_max_sections} sections can be generated at once"
+        )
+    
+    word_count_error = validate_word_count(word_count)
+    if word_count_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=word_count_error
+        )
+    
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    sections = sorted(project.sections, key=lambda x: x.order)
+    sections_by_id = {section.id: section for section in sections}
+    document_type = project.document_type.value
+    semaphore = asyncio.Semaphore(max(1, settings.generation_concurrency))
+    
+    async def generate_one(section: Section) -> str:
+        # Context comes from the sections before this one that are not being replaced
+        context_sources = [
+            context_source(other)
+            for other in sections
+            if other.order < section.order and other.content and other.id not in section_ids
+        ]
+        async with semaphore:
+            return await gemini_service.generate_section_content(
                 topic=project.topic,
                 section_title=section.title,
-                document_type=project.document_type.value,
-                context=context,
-                word_count=300 if project.document_type.value == "docx" else 150
-            )
-            
-            # Update section with generated content
-            section.content = content
-            
-            # Add to context for next sections (limit context size)
-            if len(context) < 1000:  # Limit context to prevent token overflow
-                context += f"\n\n{section.title}: {content[:200]}..."
-            
-            # Small delay to respect API rate limits
-            await asyncio.sleep(0.5)
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error generating content for section '{section.title}': {str(e)}"
+                document_type=document_type,
+                word_count=section_word_count(document_type, word_count),
+                use_cache=not fresh,
+                context_sources=context_sources
             )
     
-    # Commit all changes
+    targets = [sections_by_id[section_id] for section_id in section_ids if section_id in sections_by_id]
+    with deadline_scope(budget):
+        outcomes = await _cancel_on_disconnect(
+            request,
+            lambda: asyncio.gather(*(generate_one(section) for section in targets), return_exceptions=True)
+        )
+    
+    # Write every successful section back in a single transaction
+    errors = {}
+    for section, outcome in zip(targets, outcomes):
+        if isinstance(outcome, BaseException):
+            errors[section.id] = str(outcome)
+        else:
+            set_section_content(section, outcome)
+            section.is_stale = False
     db.commit()
-    db.refresh(project)
     
-    return project
+    # Reload the committed rows with one query rather than one refresh each
+    db.query(Section).filter(Section.id.in_([section.id for section in targets])).all()
+    
+    results = []
+    for section_id in section_ids:
+        section = sections_by_id.get(section_id)
+        if section is None:
+            results.append({"section_id": section_id, "status": "failed", "error": "Section not found"})
+        elif section_id in errors:
+            results.append({"section_id": section_id, "status": "failed", "error": errors[section_id]})
+        else:
+            results.append({"section_id": section_id, "status": "completed", "section": section})
+    
+    return {"project_id": project.id, "results": results}
 
 @router.post("/projects/{project_id}/generate/{section_id}", response_model=SectionResponse)
 async def generate_section_content(
     project_id: int,
     section_id: int,
+    request: Request,
+    fresh: bool = True,
+    word_count: Optional[int] = None,
+    budget_seconds: Optional[float] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Regenerate content for a specific section
+
+    Cached LLM responses are bypassed (a regenerate would otherwise render
+    the same prompt and return the same text) unless fresh=false.
+    word_count overrides the section length; long docx sections are written
+    in concurrent chunks. Fails with 504 if the time budget (budget_seconds)
+    runs out first.
     """
+    budget = _request_budget(budget_seconds)
+    
+    word_count_error = validate_word_count(word_count)
+    if word_count_error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=word_count_error
+        )
+    
     # Get project
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -117,28 +649,35 @@ async def generate_section_content(
         Section.order < section.order
     ).order_by(Section.order).all()
     
-    context = ""
-    for prev_section in previous_sections[-2:]:  # Last 2 sections for context
-        if prev_section.content:
-            context += f"{prev_section.title}: {prev_section.content[:150]}...\n"
+    context_sources = [
+        context_source(prev_section)
+        for prev_section in previous_sections
+        if prev_section.content
+    ]
     
     try:
         # Generate new content
-        content = await gemini_service.generate_section_content(
-            topic=project.topic,
-            section_title=section.title,
-            document_type=project.document_type.value,
-            context=context,
-            word_count=300 if project.document_type.value == "docx" else 150
-        )
+        with deadline_scope(budget):
+            content = await _cancel_on_disconnect(request, lambda: gemini_service.generate_section_content(
+                topic=project.topic,
+                section_title=section.title,
+                document_type=project.document_type.value,
+                word_count=section_word_count(project.document_type.value, word_count),
+                use_cache=not fresh,
+                hedge=True,
+                context_sources=context_sources
+            ))
         
         # Update section
-        section.content = content
+        set_section_content(section, content)
+        section.is_stale = False
         db.commit()
         db.refresh(section)
         
         return section
         
+    except (CircuitOpenError, DeadlineExceeded, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -150,10 +689,16 @@ async def generate_outline(
     topic: str,
     document_type: str,
     section_count: int = 5,
+    fresh: bool = False,
+    speculative: bool = False,
     current_user: User = Depends(get_current_user)
 ):
     """
     Generate document outline/structure using AI
+
+    Pass speculative=true to start writing the sections in the background
+    right away; generating the project with the same topic and titles soon
+    after adopts that content.
     """
     if document_type not in ["docx", "pptx"]:
         raise HTTPException(
@@ -171,9 +716,13 @@ async def generate_outline(
         titles = await gemini_service.generate_outline(
             topic=topic,
             document_type=document_type,
-            section_count=section_count
+            section_count=section_count,
+            use_cache=not fresh
         )
         
+        if speculative:
+            speculative_generations.start(current_user.id, topic, document_type, titles)
+        
         return {
             "topic": topic,
             "document_type": document_type,
@@ -183,6 +732,8 @@ async def generate_outline(
             ]
         }
         
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
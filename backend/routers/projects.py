@@ -66,7 +66,10 @@ async def list_projects(
             "user_id": project.user_id,
             "created_at": project.created_at,
             "updated_at": project.updated_at,
-            "section_count": len(project.sections)
+            "section_count": len(project.sections),
+            "like_count": project.like_count,
+            "dislike_count": project.dislike_count,
+            "comment_count": project.comment_count
         }
         result.append(ProjectListResponse(**project_dict))
     
@@ -119,6 +122,10 @@ async def update_project(
     if project_update.title is not None:
         project.title = project_update.title
     if project_update.topic is not None:
+        if project_update.topic != project.topic:
+            for section in project.sections:
+                if section.content:
+                    section.is_stale = True
         project.topic = project_update.topic
     
     db.commit()
@@ -1,27 +1,202 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Tuple, Union
+import asyncio
 from database import get_db
 from models import Section, Refinement, Feedback, User, Project
 from schemas import (
     RefinementCreate, 
     RefinementResponse, 
+    RefinementSummaryResponse,
     FeedbackCreate, 
     FeedbackResponse,
     SectionDetailResponse,
     SectionResponse,
     RefinementPreviewResponse,
-    RefinementPreviewRequest
+    RefinementPreviewRequest,
+    RefinementAcceptRequest,
+    BatchRefinementRequest,
+    BatchRefinementResponse,
+    BatchRefinementPreviewResponse,
+    SectionFeedbackSummary,
+    ProjectFeedbackSummary
 )
 from auth import get_current_user
+from config import get_settings
 from services.gemini_service import gemini_service
+from services.resilience import CircuitOpenError
+from services.preview_store import content_hash, refinement_previews
+from services.refinement_history import reconstruct, record_refinement
+from services.summarizer import set_section_content
+from services.pagination import InvalidCursor, page_size, paginate
+from services.feedback_stats import COUNTER_COLUMNS, counter_values, feedback_counts, increment_feedback_counters
+from services.feedback_writer import FeedbackEvent, feedback_writer
+
+settings = get_settings()
 
 router = APIRouter(prefix="/refinement", tags=["refinement"])
 
+def _page(query, model, limit: Optional[int], cursor: Optional[str]) -> Tuple[List, Optional[str]]:
+    try:
+        return paginate(query, model, page_size(limit), cursor)
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _full_refinement(refinement: Refinement, version: Tuple[str, str]) -> RefinementResponse:
+    previous_content, new_content = version
+    return RefinementResponse(
+        id=refinement.id,
+        prompt=refinement.prompt,
+        previous_content=previous_content,
+        new_content=new_content,
+        section_id=refinement.section_id,
+        created_at=refinement.created_at
+    )
+
+def _batch_targets(
+    db: Session,
+    project_id: int,
+    current_user: User,
+    section_ids: Optional[List[int]]
+) -> Tuple[Project, List[Section], List[dict]]:
+    """
+    Resolve the sections a batch refinement applies to
+
+    Returns:
+        The project, the sections to refine, and failed results for
+        requested sections that are missing or have no content
+    """
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    sections = sorted(project.sections, key=lambda x: x.order)
+    if section_ids is None:
+        return project, [section for section in sections if section.content], []
+    
+    section_ids = list(dict.fromkeys(section_ids))
+    if len(section_ids) > settings.batch_max_sections:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.batch_max_sections} sections can be refined at once"
+        )
+    
+    sections_by_id = {section.id: section for section in sections}
+    targets, failures = [], []
+    for section_id in section_ids:
+        section = sections_by_id.get(section_id)
+        if section is None:
+            failures.append({"section_id": section_id, "status": "failed", "error": "Section not found"})
+        elif not section.content:
+            failures.append({
+                "section_id": section_id,
+                "status": "failed",
+                "error": "Cannot refine section without existing content"
+            })
+        else:
+            targets.append(section)
+    return project, targets, failures
+
+async def _refine_all(sections: List[Section], prompt: str, use_cache: bool) -> list:
+    """
+    Refine sections concurrently, at most batch_refine_concurrency at a time
+
+    Returns:
+        Refined content or the exception raised, in the order of `sections`
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.batch_refine_concurrency))
+    
+    async def refine_one(content: str) -> str:
+        async with semaphore:
+            return await gemini_service.refine_content(content, prompt, use_cache=use_cache)
+    
+    return await asyncio.gather(
+        *(refine_one(section.content) for section in sections),
+        return_exceptions=True
+    )
+
+@router.post("/projects/{project_id}/refine", response_model=BatchRefinementResponse)
+async def refine_sections_batch(
+    project_id: int,
+    batch: BatchRefinementRequest,
+    fresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply one refinement prompt to many sections of a project
+
+    Sections are refined concurrently; every refinement history row and
+    section update is written in one transaction. Each section's outcome
+    is reported separately.
+    """
+    project, targets, results = _batch_targets(db, project_id, current_user, batch.section_ids)
+    outcomes = await _refine_all(targets, batch.prompt, use_cache=not fresh)
+    
+    for section, outcome in zip(targets, outcomes):
+        if isinstance(outcome, BaseException):
+            results.append({"section_id": section.id, "status": "failed", "error": str(outcome)})
+            continue
+        record_refinement(db, section, batch.prompt, outcome)
+        set_section_content(section, outcome)
+        results.append({"section_id": section.id, "status": "completed", "section": section})
+    
+    db.commit()
+    
+    # Reload the committed rows with one query rather than one refresh each
+    db.query(Section).filter(Section.id.in_([section.id for section in targets])).all()
+    
+    return {"project_id": project.id, "results": results}
+
+@router.post("/projects/{project_id}/refine-preview", response_model=BatchRefinementPreviewResponse)
+async def preview_refinement_batch(
+    project_id: int,
+    batch: BatchRefinementRequest,
+    fresh: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Preview one refinement prompt across many sections without saving
+
+    Each preview can be accepted with its preview_token via refine-accept.
+    """
+    project, targets, results = _batch_targets(db, project_id, current_user, batch.section_ids)
+    outcomes = await _refine_all(targets, batch.prompt, use_cache=not fresh)
+    
+    for section, outcome in zip(targets, outcomes):
+        if isinstance(outcome, BaseException):
+            results.append({"section_id": section.id, "status": "failed", "error": str(outcome)})
+        else:
+            preview = refinement_previews.add(
+                current_user.id, section.id, section.content, batch.prompt, outcome
+            )
+            results.append({
+                "section_id": section.id,
+                "status": "completed",
+                "original_content": section.content,
+                "refined_content": outcome,
+                "preview_token": preview.token
+            })
+    
+    return {"project_id": project.id, "results": results}
+
 @router.post("/sections/{section_id}/refine", response_model=SectionResponse)
 async def refine_section(
     section_id: int,
     refinement_data: RefinementCreate,
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -56,52 +231,27 @@ async def refine_section(
         )
     
     try:
-        # Create refinement prompt
-        refinement_prompt = f"""
-You are refining existing content based on user feedback.
-
-Original Content:
-{section.content}
-
-User's Refinement Request:
-{refinement_data.prompt}
-
-Generate improved content that:
-- Addresses the user's specific refinement request
-- Maintains the overall structure and flow
-- Keeps approximately the same length
-- Improves quality based on the feedback
-- Stays relevant to the section topic
-
-Generate only the refined content, no additional formatting or explanations.
-"""
-        
         # Generate refined content
-        loop = __import__('asyncio').get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: gemini_service.model.generate_content(refinement_prompt)
+        new_content = await gemini_service.refine_content(
+            section.content,
+            refinement_data.prompt,
+            use_cache=not fresh
         )
         
-        new_content = response.text.strip()
-        
         # Store refinement history
-        refinement = Refinement(
-            prompt=refinement_data.prompt,
-            previous_content=section.content,
-            new_content=new_content,
-            section_id=section_id
-        )
-        db.add(refinement)
+        record_refinement(db, section, refinement_data.prompt, new_content)
         
         # Update section content
-        section.content = new_content
+        set_section_content(section, new_content)
         
         db.commit()
         db.refresh(section)
         
         return section
         
+    except CircuitOpenError:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -109,15 +259,33 @@ Generate only the refined content, no additional formatting or explanations.
             detail=f"Error refining content: {str(e)}"
         )
 
-@router.get("/sections/{section_id}/refinements", response_model=List[RefinementResponse])
+@router.get(
+    "/sections/{section_id}/refinements",
+    response_model=Union[List[RefinementResponse], List[RefinementSummaryResponse]]
+)
 async def get_refinements(
     section_id: int,
+    response: Response,
+    view: str = "summary",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get refinement history for a section
+    Get refinement history for a section, newest first
+
+    By default (view=summary) only the prompt, timestamp and size of each
+    refinement are listed; view=full rebuilds every version's content, or
+    fetch a single refinement for its content. Results are paged; pass
+    the X-Next-Cursor response header back as `cursor` for the next page.
     """
+    if view not in ("full", "summary"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="view must be 'full' or 'summary'"
+        )
+    
     section = db.query(Section).filter(Section.id == section_id).first()
     
     if not section:
@@ -138,11 +306,64 @@ async def get_refinements(
             detail="Not authorized to view refinements"
         )
     
-    refinements = db.query(Refinement).filter(
+    refinements, next_cursor = _page(
+        db.query(Refinement).filter(Refinement.section_id == section_id),
+        Refinement,
+        limit,
+        cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    if view == "summary":
+        return [RefinementSummaryResponse.model_validate(refinement) for refinement in refinements]
+    
+    versions = reconstruct(db, section_id, refinements)
+    return [_full_refinement(refinement, versions[refinement.id]) for refinement in refinements]
+
+@router.get("/sections/{section_id}/refinements/{refinement_id}", response_model=RefinementResponse)
+async def get_refinement(
+    section_id: int,
+    refinement_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get one refinement with its previous and new content rebuilt
+    """
+    section = db.query(Section).filter(Section.id == section_id).first()
+    
+    if not section:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Section not found"
+        )
+    
+    # Verify user owns the project
+    project = db.query(Project).filter(
+        Project.id == section.project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view refinements"
+        )
+    
+    refinement = db.query(Refinement).filter(
+        Refinement.id == refinement_id,
         Refinement.section_id == section_id
-    ).order_by(Refinement.created_at.desc()).all()
+    ).first()
+    
+    if not refinement:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Refinement not found"
+        )
     
-    return refinements
+    versions = reconstruct(db, section_id, [refinement])
+    return _full_refinement(refinement, versions[refinement.id])
 
 @router.post("/sections/{section_id}/feedback", response_model=FeedbackResponse)
 async def add_feedback(
@@ -153,6 +374,10 @@ async def add_feedback(
 ):
     """
     Add feedback (like/dislike/comment) to a section
+
+    With feedback_write_behind enabled the feedback is queued and written
+    in batches; the response is then 202 with no feedback id. If the queue
+    is full it is written immediately as usual.
     """
     section = db.query(Section).filter(Section.id == section_id).first()
     
@@ -174,6 +399,17 @@ async def add_feedback(
             detail="Not authorized to provide feedback"
         )
     
+    if settings.feedback_write_behind and feedback_writer.submit(FeedbackEvent.now(
+        section_id,
+        project.id,
+        feedback_data.feedback_type,
+        feedback_data.comment
+    )):
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"status": "queued", "section_id": section_id}
+        )
+    
     # Create feedback
     feedback = Feedback(
         feedback_type=feedback_data.feedback_type,
@@ -182,6 +418,12 @@ async def add_feedback(
     )
     
     db.add(feedback)
+    increment_feedback_counters(
+        db,
+        section_id,
+        project.id,
+        feedback_counts(feedback_data.feedback_type, feedback_data.comment)
+    )
     db.commit()
     db.refresh(feedback)
     
@@ -190,11 +432,17 @@ async def add_feedback(
 @router.get("/sections/{section_id}/feedback", response_model=List[FeedbackResponse])
 async def get_feedback(
     section_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get all feedback for a section
+    Get feedback for a section, newest first
+
+    Results are paged; pass the X-Next-Cursor response header back as
+    `cursor` for the next page.
     """
     section = db.query(Section).filter(Section.id == section_id).first()
     
@@ -216,12 +464,79 @@ async def get_feedback(
             detail="Not authorized to view feedback"
         )
     
-    feedback = db.query(Feedback).filter(
-        Feedback.section_id == section_id
-    ).order_by(Feedback.created_at.desc()).all()
+    feedback, next_cursor = _page(
+        db.query(Feedback).filter(Feedback.section_id == section_id),
+        Feedback,
+        limit,
+        cursor
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return feedback
 
+@router.get("/sections/{section_id}/feedback/summary", response_model=SectionFeedbackSummary)
+async def get_feedback_summary(
+    section_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get like/dislike/comment totals for a section without loading its feedback
+    """
+    section = db.query(Section).filter(Section.id == section_id).first()
+    
+    if not section:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Section not found"
+        )
+    
+    # Verify user owns the project
+    project = db.query(Project).filter(
+        Project.id == section.project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view feedback"
+        )
+    
+    return SectionFeedbackSummary(section_id=section.id, **counter_values(section))
+
+@router.get("/projects/{project_id}/feedback/summary", response_model=ProjectFeedbackSummary)
+async def get_project_feedback_summary(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get feedback totals for a project and each of its sections
+    """
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    # Only the counter columns, not the sections' content
+    rows = db.query(Section.id, *(getattr(Section, column) for column in COUNTER_COLUMNS)).filter(
+        Section.project_id == project_id
+    ).order_by(Section.order).all()
+    
+    return ProjectFeedbackSummary(
+        project_id=project.id,
+        **counter_values(project),
+        sections=[SectionFeedbackSummary(section_id=row.id, **counter_values(row)) for row in rows]
+    )
+
 @router.get("/sections/{section_id}/details", response_model=SectionDetailResponse)
 async def get_section_details(
     section_id: int,
@@ -229,7 +544,12 @@ async def get_section_details(
     db: Session = Depends(get_db)
 ):
     """
-    Get section with all refinements and feedback
+    Get section with its latest refinement summaries and feedback
+
+    Only the newest `detail_embed_limit` items of each are embedded; the
+    *_next_cursor fields continue them on the /refinements and /feedback
+    listings. Refinement content is fetched per version from
+    /sections/{section_id}/refinements/{refinement_id}.
     """
     section = db.query(Section).filter(Section.id == section_id).first()
     
@@ -251,17 +571,46 @@ async def get_section_details(
             detail="Not authorized to view section details"
         )
     
-    return section
+    refinements, refinements_cursor = paginate(
+        db.query(Refinement).filter(Refinement.section_id == section_id),
+        Refinement,
+        settings.detail_embed_limit
+    )
+    feedback, feedback_cursor = paginate(
+        db.query(Feedback).filter(Feedback.section_id == section_id),
+        Feedback,
+        settings.detail_embed_limit
+    )
+    
+    return SectionDetailResponse(
+        id=section.id,
+        title=section.title,
+        order=section.order,
+        content=section.content,
+        project_id=section.project_id,
+        created_at=section.created_at,
+        updated_at=section.updated_at,
+        **counter_values(section),
+        refinements=[RefinementSummaryResponse.model_validate(refinement) for refinement in refinements],
+        refinements_next_cursor=refinements_cursor,
+        feedback=[FeedbackResponse.model_validate(item) for item in feedback],
+        feedback_next_cursor=feedback_cursor
+    )
 
 @router.post("/sections/{section_id}/refine-preview", response_model=RefinementPreviewResponse)
 async def preview_refinement(
     section_id: int,
     refinement_data: RefinementPreviewRequest,
+    fresh: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
     Preview refinement without saving - for accept/reject workflow
+
+    The preview is kept server-side; accept it with its preview_token.
+    Previewing the same prompt on unchanged content returns the stored
+    preview unless fresh=true.
     """
     section = db.query(Section).filter(Section.id == section_id).first()
     
@@ -289,42 +638,41 @@ async def preview_refinement(
             detail="Cannot refine section without existing content"
         )
     
+    if not fresh:
+        stored = refinement_previews.find(
+            current_user.id, section_id, section.content, refinement_data.prompt
+        )
+        if stored:
+            return RefinementPreviewResponse(
+                original_content=section.content,
+                refined_content=stored.refined_content,
+                section_id=section_id,
+                preview_token=stored.token,
+                reused=True
+            )
+    
     try:
-        # Create refinement prompt
-        refinement_prompt = f"""
-You are refining existing content based on user feedback.
-
-Original Content:
-{section.content}
-
-User's Refinement Request:
-{refinement_data.prompt}
-
-Generate improved content that:
-- Addresses the user's specific refinement request
-- Maintains the overall structure and flow
-- Keeps approximately the same length
-- Improves quality based on the feedback
-- Stays relevant to the section topic
-
-Generate only the refined content, no additional formatting or explanations.
-"""
-        
         # Generate refined content
-        loop = __import__('asyncio').get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: gemini_service.model.generate_content(refinement_prompt)
+        new_content = await gemini_service.refine_content(
+            section.content,
+            refinement_data.prompt,
+            use_cache=not fresh,
+            hedge=True
         )
         
-        new_content = response.text.strip()
+        preview = refinement_previews.add(
+            current_user.id, section_id, section.content, refinement_data.prompt, new_content
+        )
         
         return RefinementPreviewResponse(
             original_content=section.content,
             refined_content=new_content,
-            section_id=section_id
+            section_id=section_id,
+            preview_token=preview.token
         )
         
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -334,12 +682,12 @@ Generate only the refined content, no additional formatting or explanations.
 @router.post("/sections/{section_id}/refine-accept")
 async def accept_refinement(
     section_id: int,
-    data: dict = Body(...),  # Changed to accept a dict
+    accept_data: RefinementAcceptRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Accept and save the refined content
+    Accept and save a stored refinement preview
     """
     section = db.query(Section).filter(Section.id == section_id).first()
     
@@ -361,30 +709,30 @@ async def accept_refinement(
             detail="Not authorized"
         )
     
-    # Extract data
-    prompt = data.get('prompt')
-    new_content = data.get('content')
+    preview = refinement_previews.get(accept_data.preview_token)
     
-    if not prompt or not new_content:
+    if not preview or preview.section_id != section_id or preview.user_id != current_user.id:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Prompt and content are required"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Preview not found or expired"
+        )
+    
+    if content_hash(section.content or "") != preview.content_hash:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Section has changed since this preview was generated"
         )
     
     # Store refinement history
-    refinement = Refinement(
-        prompt=prompt,
-        previous_content=section.content,
-        new_content=new_content,
-        section_id=section_id
-    )
-    db.add(refinement)
+    record_refinement(db, section, preview.prompt, preview.refined_content)
     
     # Update section content
-    section.content = new_content
+    set_section_content(section, preview.refined_content)
     
     db.commit()
     db.refresh(section)
     
+    refinement_previews.discard(preview)
+    
     return {"message": "Refinement accepted", "section": section}
 
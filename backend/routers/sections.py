@@ -4,6 +4,7 @@ from database import get_db
 from models import Section, Project, User
 from schemas import SectionResponse
 from auth import get_current_user
+from services.summarizer import set_section_content
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/sections", tags=["sections"])
@@ -44,9 +45,13 @@ async def update_section(
     
     # Update fields
     if update_data.title is not None:
+        if update_data.title != section.title and section.content:
+            # Content was written for the old title; resume will regenerate it
+            section.is_stale = True
         section.title = update_data.title
     if update_data.content is not None:
-        section.content = update_data.content
+        set_section_content(section, update_data.content)
+        section.is_stale = False
     
     db.commit()
     db.refresh(section)
@@ -37,6 +37,11 @@ class SectionCreate(SectionBase):
 class SectionResponse(SectionBase):
     id: int
     content: Optional[str] = None
+    summary: Optional[str] = None
+    is_stale: bool = False
+    like_count: int = 0
+    dislike_count: int = 0
+    comment_count: int = 0
     project_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -59,6 +64,16 @@ class RefinementResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RefinementSummaryResponse(BaseModel):
+    id: int
+    prompt: str
+    section_id: int
+    content_size: Optional[int] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class RefinementPreviewRequest(BaseModel):
     prompt: str
 
@@ -66,6 +81,11 @@ class RefinementPreviewResponse(BaseModel):
     original_content: str
     refined_content: str
     section_id: int
+    preview_token: str
+    reused: bool = False
+
+class RefinementAcceptRequest(BaseModel):
+    preview_token: str
 
 # Feedback Schemas
 class FeedbackCreate(BaseModel):
@@ -82,15 +102,32 @@ class FeedbackResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class FeedbackSummaryResponse(BaseModel):
+    like_count: int = 0
+    dislike_count: int = 0
+    comment_count: int = 0
+
+class SectionFeedbackSummary(FeedbackSummaryResponse):
+    section_id: int
+
+class ProjectFeedbackSummary(FeedbackSummaryResponse):
+    project_id: int
+    sections: List[SectionFeedbackSummary] = []
+
 # Section with Refinements and Feedback
 class SectionDetailResponse(SectionBase):
     id: int
     content: Optional[str] = None
+    like_count: int = 0
+    dislike_count: int = 0
+    comment_count: int = 0
     project_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
-    refinements: List[RefinementResponse] = []
+    refinements: List[RefinementSummaryResponse] = []
+    refinements_next_cursor: Optional[str] = None
     feedback: List[FeedbackResponse] = []
+    feedback_next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -113,6 +150,9 @@ class ProjectResponse(ProjectBase):
     user_id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
+    like_count: int = 0
+    dislike_count: int = 0
+    comment_count: int = 0
     sections: List[SectionResponse] = []
 
     class Config:
@@ -124,7 +164,61 @@ class ProjectListResponse(ProjectBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     section_count: int = 0
+    like_count: int = 0
+    dislike_count: int = 0
+    comment_count: int = 0
 
     class Config:
         from_attributes = True
 
+# Generation Job Schemas
+class JobSectionStatus(BaseModel):
+    section_id: int
+    title: str
+    order: int
+    status: str
+
+class JobResponse(BaseModel):
+    job_id: str
+    project_id: int
+    mode: str
+    status: str
+    error: Optional[str] = None
+    sections: List[JobSectionStatus] = []
+    created_at: datetime
+    updated_at: datetime
+
+# Batch Generation Schemas
+class BatchGenerateRequest(BaseModel):
+    section_ids: List[int]
+
+class SectionBatchResult(BaseModel):
+    section_id: int
+    status: str
+    error: Optional[str] = None
+    section: Optional[SectionResponse] = None
+
+class BatchGenerateResponse(BaseModel):
+    project_id: int
+    results: List[SectionBatchResult] = []
+
+# Batch Refinement Schemas
+class BatchRefinementRequest(BaseModel):
+    prompt: str
+    section_ids: Optional[List[int]] = None  # None refines every section with content
+
+class BatchRefinementResponse(BaseModel):
+    project_id: int
+    results: List[SectionBatchResult] = []
+
+class RefinementPreviewResult(BaseModel):
+    section_id: int
+    status: str
+    error: Optional[str] = None
+    original_content: Optional[str] = None
+    refined_content: Optional[str] = None
+    preview_token: Optional[str] = None
+
+class BatchRefinementPreviewResponse(BaseModel):
+    project_id: int
+    results: List[RefinementPreviewResult] = []
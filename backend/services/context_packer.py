@@ -0,0 +1,98 @@
+from typing import Dict, List, NamedTuple
+from collections import Counter
+import math
+import re
+from services.rate_limiter import estimate_tokens
+from services.summarizer import content_words
+
+# Standard BM25 parameters: term-frequency saturation and length normalisation
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+class ContextSource(NamedTuple):
+    """An earlier section offered as context for the one being written"""
+    title: str
+    summary: str
+    content: str
+
+class _Unit(NamedTuple):
+    source: int  # index into the sources list
+    kind: int  # 0 = summary, 1 = paragraph
+    position: int
+    text: str
+
+def _units(sources: List[ContextSource]) -> List[_Unit]:
+    units = []
+    for index, source in enumerate(sources):
+        if source.summary:
+            units.append(_Unit(index, 0, 0, source.summary))
+        paragraphs = [part.strip() for part in re.split(r'\n\s*\n', source.content or "") if part.strip()]
+        for position, paragraph in enumerate(paragraphs):
+            units.append(_Unit(index, 1, position, paragraph))
+    return units
+
+def bm25_scores(query: List[str], documents: List[List[str]]) -> List[float]:
+    """
+    BM25 relevance of each tokenized document to the query terms
+    """
+    if not documents:
+        return []
+    average_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for doc in documents for term in set(doc))
+    idf: Dict[str, float] = {
+        term: math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+        for term in set(query)
+    }
+
+    scores = []
+    for doc in documents:
+        frequencies = Counter(doc)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / average_length)
+        score = 0.0
+        for term in set(query):
+            tf = frequencies.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+def pack_context(target_title: str, sources: List[ContextSource], token_budget: int) -> str:
+    """
+    Fill a token budget with the earlier material most relevant to a section
+
+    Section summaries and paragraphs are ranked by BM25 against the target
+    title. Ties (including no overlap at all) go to the nearest sections and
+    to summaries over paragraphs, so the text just before the target is
+    still there for transitions. Picks are laid out in document order.
+    """
+    units = _units(sources)
+    if not units or token_budget <= 0:
+        return ""
+
+    scores = bm25_scores(content_words(target_title), [content_words(unit.text) for unit in units])
+    ranked = sorted(
+        range(len(units)),
+        key=lambda idx: (-scores[idx], -units[idx].source, units[idx].kind, units[idx].position)
+    )
+
+    chosen, used, titled = [], 0, set()
+    for index in ranked:
+        unit = units[index]
+        cost = estimate_tokens(unit.text)
+        if unit.source not in titled:
+            cost += estimate_tokens(sources[unit.source].title)
+        if used + cost > token_budget:
+            continue
+        chosen.append(unit)
+        titled.add(unit.source)
+        used += cost
+
+    blocks = []
+    for source_index in sorted({unit.source for unit in chosen}):
+        picked = sorted(
+            (unit for unit in chosen if unit.source == source_index),
+            key=lambda unit: (unit.kind, unit.position)
+        )
+        text = "\n".join(unit.text for unit in picked)
+        blocks.append(f"{sources[source_index].title}: {text}")
+    return "\n\n".join(blocks)
@@ -0,0 +1,76 @@
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import time
+
+T = TypeVar("T")
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out before an LLM call finishes"""
+    def __init__(self):
+        super().__init__("Request time budget exhausted")
+
+class Deadline:
+    """
+    Point in time by which a request's LLM work must be done
+    """
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("llm_deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    Deadline of the request this code runs on behalf of, if any
+    """
+    return _current_deadline.get()
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """
+    Give every LLM call made inside the block (including tasks it spawns)
+    at most `seconds` in total; a nested scope can only shorten an outer one
+    """
+    if seconds is None:
+        yield current_deadline()
+        return
+
+    deadline = Deadline(seconds)
+    outer = current_deadline()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+async def run_with_deadline(fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    Await `fn()` with the current deadline's remaining time as its timeout
+
+    Raises:
+        DeadlineExceeded: The budget ran out before or during the call
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return await fn()
+
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded()
+    try:
+        return await asyncio.wait_for(fn(), timeout=remaining)
+    except asyncio.TimeoutError:
+        if deadline.expired:
+            raise DeadlineExceeded()
+        raise
@@ -0,0 +1,52 @@
+from typing import Counter as CounterType, Dict, Optional, Tuple
+from collections import Counter, defaultdict
+from sqlalchemy.orm import Session
+from models import FeedbackType, Project, Section
+
+COUNTER_COLUMNS = ("like_count", "dislike_count", "comment_count")
+
+def feedback_counts(feedback_type: Optional[FeedbackType], comment: Optional[str]) -> CounterType[str]:
+    """
+    Counter increments for one feedback entry, keyed by counter column name
+    """
+    counts: CounterType[str] = Counter()
+    if feedback_type == FeedbackType.LIKE:
+        counts["like_count"] += 1
+    elif feedback_type == FeedbackType.DISLIKE:
+        counts["dislike_count"] += 1
+    if comment and comment.strip():
+        counts["comment_count"] += 1
+    return counts
+
+def _increment(db: Session, model, row_id: int, counts: CounterType[str]):
+    values = {
+        getattr(model, column): getattr(model, column) + counts[column]
+        for column in COUNTER_COLUMNS if counts[column]
+    }
+    if values:
+        # UPDATE ... SET n = n + k, so concurrent writers never lose an increment
+        db.query(model).filter(model.id == row_id).update(values, synchronize_session=False)
+
+def increment_feedback_counters(db: Session, section_id: int, project_id: int, counts: CounterType[str]):
+    """
+    Add feedback counts to a section and its project in the current transaction
+    """
+    _increment(db, Section, section_id, counts)
+    _increment(db, Project, project_id, counts)
+
+def increment_feedback_counters_bulk(db: Session, counts: Dict[Tuple[int, int], CounterType[str]]):
+    """
+    Add many sections' feedback counts, with one update per section and per project
+
+    Args:
+        counts: Counter increments by (section_id, project_id)
+    """
+    by_project: Dict[int, CounterType[str]] = defaultdict(Counter)
+    for (section_id, project_id), section_counts in counts.items():
+        _increment(db, Section, section_id, section_counts)
+        by_project[project_id] += section_counts
+    for project_id, project_counts in by_project.items():
+        _increment(db, Project, project_id, project_counts)
+
+def counter_values(row) -> dict:
+    return {column: getattr(row, column) or 0 for column in COUNTER_COLUMNS}
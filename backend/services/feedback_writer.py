@@ -0,0 +1,215 @@
+from typing import Counter as CounterType, Dict, List, NamedTuple, Optional, Tuple
+from collections import Counter
+from datetime import datetime, timezone
+import asyncio
+import logging
+from config import get_settings
+from database import SessionLocal
+from models import Feedback, FeedbackType, Section
+from services.feedback_stats import feedback_counts, increment_feedback_counters, increment_feedback_counters_bulk
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+class FeedbackEvent(NamedTuple):
+    """A validated feedback entry waiting to be written"""
+    section_id: int
+    project_id: int
+    feedback_type: Optional[FeedbackType]
+    comment: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def now(
+        cls,
+        section_id: int,
+        project_id: int,
+        feedback_type: Optional[FeedbackType],
+        comment: Optional[str]
+    ) -> "FeedbackEvent":
+        return cls(section_id, project_id, feedback_type, comment, datetime.now(timezone.utc))
+
+class FeedbackWriter:
+    """
+    Write-behind buffer for feedback inserts
+
+    Events go on a bounded in-process queue and a single worker writes them
+    with one bulk insert and one counter update per section and project,
+    once `batch_size` events are waiting or `flush_interval` seconds after
+    the first one arrived. `stop()` writes everything still buffered.
+    A failed batch is retried `retries` times, then written row by row.
+    """
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        retries: int = 2,
+        retry_delay: float = 0.5
+    ):
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retries = max(0, retries)
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Events taken off the queue but not yet written, so stop() can still flush them
+        self._pending: List[FeedbackEvent] = []
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def _start(self):
+        # The worker is created lazily so it binds to the server's event loop
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._work())
+
+    def submit(self, event: FeedbackEvent) -> bool:
+        """
+        Queue an event for writing
+
+        Returns:
+            False if the queue is full and the caller must write the event itself
+        """
+        self._start()
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        return True
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pending.append(await self._queue.get())
+            flush_at = loop.time() + self.flush_interval
+            while len(self._pending) < self.batch_size:
+                remaining = flush_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._pending.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush()
+
+    async def _flush(self):
+        """
+        Write the pending events: as one batch, retried with backoff, and
+        failing that row by row so only the rows that really fail are lost
+        """
+        # Events stay in _pending until written, so a flush interrupted by stop() is redone
+        if not self._pending:
+            return
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+            if self._write_batch(self._pending):
+                self._pending = []
+                return
+        self._write_rows(self._pending)
+        self._pending = []
+
+    def _drop(self, events: List[FeedbackEvent], reason: str):
+        for event in events:
+            logger.warning("Dropped feedback for section %s: %s", event.section_id, reason)
+        self.dropped += len(events)
+
+    def _write_batch(self, batch: List[FeedbackEvent]) -> bool:
+        db = SessionLocal()
+        try:
+            # Sections deleted since the click would fail the whole insert on their FK
+            projects = dict(db.query(Section.id, Section.project_id).filter(
+                Section.id.in_({event.section_id for event in batch})
+            ).all())
+            events = [event for event in batch if event.section_id in projects]
+
+            counts: Dict[Tuple[int, int], CounterType[str]] = {}
+            for event in events:
+                key = (event.section_id, projects[event.section_id])
+                counts[key] = counts.get(key, Counter()) + feedback_counts(event.feedback_type, event.comment)
+
+            db.bulk_insert_mappings(Feedback, [
+                {
+                    "section_id": event.section_id,
+                    "feedback_type": event.feedback_type,
+                    "comment": event.comment,
+                    "created_at": event.created_at
+                }
+                for event in events
+            ])
+            increment_feedback_counters_bulk(db, counts)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning("Feedback batch of %d failed", len(batch), exc_info=True)
+            return False
+        finally:
+            db.close()
+
+        self.written += len(events)
+        self.flushes += 1
+        self._drop([event for event in batch if event.section_id not in projects], "section no longer exists")
+        return True
+
+    def _write_rows(self, batch: List[FeedbackEvent]):
+        db = SessionLocal()
+        try:
+            for event in batch:
+                try:
+                    project_id = db.query(Section.project_id).filter(Section.id == event.section_id).scalar()
+                    if project_id is None:
+                        self._drop([event], "section no longer exists")
+                        continue
+                    db.add(Feedback(
+                        feedback_type=event.feedback_type,
+                        comment=event.comment,
+                        section_id=event.section_id,
+                        created_at=event.created_at
+                    ))
+                    increment_feedback_counters(
+                        db, event.section_id, project_id, feedback_counts(event.feedback_type, event.comment)
+                    )
+                    db.commit()
+                    self.written += 1
+                except Exception as e:
+                    db.rollback()
+                    self._drop([event], str(e))
+        finally:
+            db.close()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        while not self._queue.empty():
+            self._pending.append(self._queue.get_nowait())
+        await self._flush()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.feedback_write_behind,
+            "queue_depth": (self._queue.qsize() if self._queue else 0) + len(self._pending),
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+            "rejected": self.rejected
+        }
+
+# Shared write-behind buffer for feedback
+feedback_writer = FeedbackWriter(
+    max_queue=settings.feedback_queue_size,
+    batch_size=settings.feedback_batch_size,
+    flush_interval=settings.feedback_flush_interval,
+    retries=settings.feedback_flush_retries,
+    retry_delay=settings.feedback_flush_retry_delay
+)
@@ -1,41 +1,317 @@
-import google.generativeai as genai
-from typing import Optional, List
-import asyncio
+from typing import Optional, List, Dict, AsyncIterator, Callable
 from config import get_settings
+from services.rate_limiter import RateLimiter, estimate_tokens
+from services.llm_cache import LLMCache, LRUCache
+from services.llm_backends import LLMBackend, StreamEnd, create_llm_backend
+from services.single_flight import SingleFlight
+from services.hedging import Hedger
+from services.deadline import DeadlineExceeded, run_with_deadline
+from services.context_packer import ContextSource, pack_context
+from services.summarizer import content_words, split_sentences
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    is_outage,
+    is_retryable,
+    retry_after_seconds
+)
+import asyncio
+import math
 import re
 
 settings = get_settings()
 
+# Openers and closers that only make sense at the very start or end of a section
+_CHUNK_INTRO_PATTERN = re.compile(
+    r'^(?:in this (?:section|part)|this (?:section|part) (?:will|explores|examines|discusses|covers))\b[^.!?]*[.!?]\s*',
+    re.IGNORECASE
+)
+_CHUNK_CONCLUSION_PATTERN = re.compile(
+    r'^(?:in conclusion|in summary|to conclude|to summarize|to sum up)\b',
+    re.IGNORECASE
+)
+
+# Word overlap above which a chunk's opening sentence restates the previous chunk's ending
+_RESTATEMENT_OVERLAP = 0.6
+
+# Marker line that opens each section in a whole-document response,
+# tolerating stray markdown and a trailing title: "**=== SECTION 2: Intro ===**"
+SECTION_MARKER_PATTERN = re.compile(
+    r'^[\s*#_]*=+\s*SECTION\s+(\d+)\b[^\n]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+class StreamingCleaner:
+    """
+    Apply a line-based cleaning function to streamed text incrementally
+
+    Text is buffered until a full line is available, so markdown that the
+    batch cleaners would strip never reaches the client half-cleaned.
+    """
+    def __init__(self, clean: Callable[[str], str], paragraph_breaks: bool):
+        self._clean = clean
+        self._paragraph_breaks = paragraph_breaks
+        self._buffer = ""
+        self._started = False
+        self._blank_pending = False
+    
+    def feed(self, chunk: str) -> str:
+        """
+        Add a raw chunk and return whatever cleaned text is now complete
+        """
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        return self._emit(lines)
+    
+    def flush(self) -> str:
+        """
+        Clean and return the trailing partial line
+        """
+        lines = [self._buffer]
+        self._buffer = ""
+        return self._emit(lines)
+    
+    def _emit(self, lines: List[str]) -> str:
+        output = []
+        for line in lines:
+            cleaned = self._clean(line)
+            if not cleaned:
+                self._blank_pending = self._started
+                continue
+            if self._started:
+                output.append('\n\n' if self._paragraph_breaks and self._blank_pending else '\n')
+            output.append(cleaned)
+            self._started = True
+            self._blank_pending = False
+        return ''.join(output)
+
 class GeminiService:
-    def __init__(self):
-        """Initialize Gemini API with API key"""
-        genai.configure(api_key=settings.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        """
+        Set up the LLM backend (Gemini unless settings.llm_backend says otherwise)
+        and the shared rate limiter, caches and request coalescing around it
+        """
+        self.backend = backend or create_llm_backend(settings)
+        self.cache = LLMCache(
+            max_entries=settings.llm_cache_max_entries,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            path=settings.llm_cache_path
+        ) if settings.llm_cache_enabled else None
+        self.outline_cache = LRUCache(
+            max_entries=settings.outline_cache_max_entries,
+            ttl_seconds=settings.outline_cache_ttl_seconds
+        )
+        self.single_flight = SingleFlight()
+        self.retry_policy = RetryPolicy(
+            max_attempts=settings.llm_retry_max_attempts,
+            base_delay=settings.llm_retry_base_delay,
+            max_delay=settings.llm_retry_max_delay
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=settings.llm_circuit_failure_threshold,
+            reset_seconds=settings.llm_circuit_reset_seconds
+        )
+        self.hedger = Hedger(
+            percentile=settings.llm_hedge_percentile,
+            max_ratio=settings.llm_hedge_max_ratio,
+            min_samples=settings.llm_hedge_min_samples
+        )
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=settings.gemini_requests_per_minute,
+            tokens_per_minute=settings.gemini_tokens_per_minute
+        )
     
-    async def generate_section_content(
-        self, 
-        topic: str, 
-        section_title: str,
-        document_type: str = "docx",
-        context: str = "",
-        word_count: int = 250
+    @property
+    def model_name(self) -> str:
+        return self.backend.model_name
+    
+    def _cache_key(self, prompt: str) -> Optional[str]:
+        return LLMCache.make_key(self.model_name, prompt) if self.cache else None
+    
+    async def _generate(
+        self,
+        prompt: str,
+        expected_output_tokens: int = 1024,
+        use_cache: bool = True,
+        hedge: bool = False
     ) -> str:
         """
-        Generate content for a specific section using Gemini API
+        Send a prompt to the LLM backend through the shared rate limiter
         
         Args:
-            topic: Main topic of the document
-            section_title: Title of the current section
-            document_type: Type of document (docx/pptx)
-            context: Previous sections content for context
-            word_count: Target word count for the content
+            prompt: Fully rendered prompt
+            expected_output_tokens: Completion size used to budget the call
+            use_cache: Serve from / store in the response cache; False forces
+                a fresh generation (the result still refreshes the cache)
+            hedge: Fire a duplicate call if this one runs unusually long;
+                meant for interactive calls where a user waits on one response
             
         Returns:
-            Generated content as string (clean, no markdown)
+            Raw response text
         """
-        try:
-            if document_type == "pptx":
-                prompt = f"""
+        cache_key = self._cache_key(prompt)
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        # Identical prompts already in flight share that call's result; each
+        # caller stops waiting when its own request deadline runs out
+        flight_key = cache_key or LLMCache.make_key(self.model_name, prompt)
+        return await run_with_deadline(lambda: self.single_flight.do(
+            flight_key,
+            lambda: self._generate_uncached(prompt, expected_output_tokens, cache_key, hedge)
+        ))
+    
+    async def _generate_uncached(
+        self,
+        prompt: str,
+        expected_output_tokens: int,
+        cache_key: Optional[str],
+        hedge: bool = False
+    ) -> str:
+        """
+        Rate-limited backend call whose result is written to the cache
+        """
+        estimated_tokens = estimate_tokens(prompt) + expected_output_tokens
+        attempt = 0
+        
+        while True:
+            self.circuit_breaker.before_call()
+            try:
+                await self.rate_limiter.acquire(estimated_tokens)
+                response = await self.hedger.run(
+                    lambda: self.backend.generate(prompt),
+                    backup=lambda: self._generate_backup(prompt, estimated_tokens),
+                    hedge=hedge and settings.llm_hedging_enabled
+                )
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.circuit_breaker.abandon()
+                raise
+            
+            self.circuit_breaker.record_success()
+            break
+        
+        # Settle the token budget with the real usage when the backend reports it
+        if response.total_tokens:
+            self.rate_limiter.record_usage(estimated_tokens, response.total_tokens)
+        
+        text = response.text
+        if cache_key:
+            self.cache.set(cache_key, text)
+        
+        return text
+    
+    async def _generate_backup(self, prompt: str, estimated_tokens: int):
+        # A hedge is a real extra call, so it pays into the rate limiter too
+        await self.rate_limiter.acquire(estimated_tokens)
+        return await self.backend.generate(prompt)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Record a failed attempt with the circuit breaker
+        
+        Returns:
+            Seconds to back off before retrying, or None if the error is not
+            retryable or the attempts are used up
+        """
+        if is_outage(error):
+            self.circuit_breaker.record_failure()
+        else:
+            # The upstream answered, even if it refused this request
+            self.circuit_breaker.record_success()
+        
+        if not is_retryable(error):
+            return None
+        if attempt + 1 >= self.retry_policy.max_attempts:
+            self.retry_policy.gave_up += 1
+            return None
+        
+        self.retry_policy.retries += 1
+        return self.retry_policy.backoff(attempt, retry_after_seconds(error))
+    
+    async def _stream(
+        self,
+        prompt: str,
+        expected_output_tokens: int = 1024,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream a prompt's response text from the backend through the shared rate limiter
+        
+        A cached response is yielded as a single chunk. Failures are retried
+        only until the first chunk has been yielded. Waiting for each chunk
+        is bounded by the current request deadline.
+        """
+        cache_key = self._cache_key(prompt)
+        if cache_key and use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        estimated_tokens = estimate_tokens(prompt) + expected_output_tokens
+        attempt = 0
+        
+        while True:
+            self.circuit_breaker.before_call()
+            chunks = []
+            stream = self.backend.stream(prompt)
+            try:
+                await run_with_deadline(lambda: self.rate_limiter.acquire(estimated_tokens))
+                while True:
+                    try:
+                        item = await run_with_deadline(stream.__anext__)
+                    except StopAsyncIteration:
+                        break
+                    if isinstance(item, StreamEnd):
+                        if item.total_tokens:
+                            self.rate_limiter.record_usage(estimated_tokens, item.total_tokens)
+                        if cache_key:
+                            self.cache.set(cache_key, "".join(chunks))
+                        continue
+                    chunks.append(item)
+                    yield item
+            except DeadlineExceeded:
+                self.circuit_breaker.abandon()
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or chunks:
+                    raise
+                await run_with_deadline(lambda: asyncio.sleep(delay))
+                attempt += 1
+                continue
+            except BaseException:
+                self.circuit_breaker.abandon()
+                raise
+            finally:
+                await stream.aclose()
+            
+            self.circuit_breaker.record_success()
+            return
+    
+    def _build_section_prompt(
+        self,
+        topic: str,
+        section_title: str,
+        document_type: str,
+        context: str,
+        word_count: int
+    ) -> str:
+        """
+        Render the section generation prompt for a document type
+        """
+        if document_type == "pptx":
+            return f"""
 You are a professional presentation content writer. Create concise, impactful slide content.
 
 Presentation Topic: {topic}
@@ -59,8 +335,8 @@ Second important insight or detail
 Third main takeaway
 Fourth supporting information
 """
-            else:  # docx
-                prompt = f"""
+        # docx
+        return f"""
 You are a professional technical writer creating high-quality document content.
 
 Document Topic: {topic}
@@ -80,14 +356,75 @@ Do not include the section title.
 Use natural paragraph breaks (blank line between paragraphs).
 Write in plain text format ready for direct insertion into a document.
 """
-
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.model.generate_content(prompt)
+    
+    def _pack_context(
+        self,
+        section_title: str,
+        context: str,
+        context_sources: Optional[List[ContextSource]]
+    ) -> str:
+        """
+        Append the most relevant earlier material to a caller's context
+        """
+        if not context_sources:
+            return context
+        packed = pack_context(section_title, context_sources, settings.context_token_budget)
+        return "\n\n".join(part for part in (context, packed) if part)
+    
+    async def generate_section_content(
+        self, 
+        topic: str, 
+        section_title: str,
+        document_type: str = "docx",
+        context: str = "",
+        word_count: int = 250,
+        use_cache: bool = True,
+        hedge: bool = False,
+        context_sources: Optional[List[ContextSource]] = None
+    ) -> str:
+        """
+        Generate content for a specific section using Gemini API
+        
+        Document sections of long_section_threshold_words or more are planned
+        and written in concurrent chunks (see generate_long_section_content).
+        
+        Args:
+            topic: Main topic of the document
+            section_title: Title of the current section
+            document_type: Type of document (docx/pptx)
+            context: Previous sections content for context
+            word_count: Target word count for the content
+            use_cache: False to bypass cached responses
+            hedge: Hedge a slow call with a duplicate (interactive requests)
+            context_sources: Earlier sections to pack into the context by
+                relevance to this section, within the context token budget
+            
+        Returns:
+            Generated content as string (clean, no markdown)
+        """
+        if document_type == "docx" and word_count >= settings.long_section_threshold_words:
+            return await self.generate_long_section_content(
+                topic=topic,
+                section_title=section_title,
+                context=self._pack_context(section_title, context, context_sources),
+                word_count=word_count,
+                use_cache=use_cache
+            )
+        
+        try:
+            context = self._pack_context(section_title, context, context_sources)
+            prompt = self._build_section_prompt(
+                topic, section_title, document_type, context, word_count
             )
             
-            content = response.text.strip()
+            response_text = await self._generate(
+                prompt,
+                expected_output_tokens=word_count * 2,
+                use_cache=use_cache,
+                hedge=hedge
+            )
+            
+            content = response_text.strip()
             
             # Clean up any remaining markdown artifacts
             if document_type == "pptx":
@@ -97,9 +434,416 @@ Write in plain text format ready for direct insertion into a document.
             
             return content
             
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Error generating content with Gemini: {str(e)}")
     
+    async def stream_section_content(
+        self,
+        topic: str,
+        section_title: str,
+        document_type: str = "docx",
+        context: str = "",
+        word_count: int = 250,
+        use_cache: bool = True,
+        context_sources: Optional[List[ContextSource]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream content for a specific section as Gemini produces it
+        
+        Long document sections (see generate_section_content) are written in
+        concurrent chunks and yielded whole once stitched.
+        
+        Args:
+            topic: Main topic of the document
+            section_title: Title of the current section
+            document_type: Type of document (docx/pptx)
+            context: Previous sections content for context
+            word_count: Target word count for the content
+            use_cache: False to bypass cached responses
+            context_sources: Earlier sections to pack into the context
+            
+        Yields:
+            Cleaned text deltas; joined together they form the section content
+        """
+        if document_type == "docx" and word_count >= settings.long_section_threshold_words:
+            yield await self.generate_long_section_content(
+                topic=topic,
+                section_title=section_title,
+                context=self._pack_context(section_title, context, context_sources),
+                word_count=word_count,
+                use_cache=use_cache
+            )
+            return
+        
+        context = self._pack_context(section_title, context, context_sources)
+        prompt = self._build_section_prompt(
+            topic, section_title, document_type, context, word_count
+        )
+        
+        if document_type == "pptx":
+            cleaner = StreamingCleaner(self._clean_bullet_content, paragraph_breaks=False)
+        else:
+            cleaner = StreamingCleaner(self._clean_paragraph_content, paragraph_breaks=True)
+        
+        try:
+            async for chunk in self._stream(
+                prompt,
+                expected_output_tokens=word_count * 2,
+                use_cache=use_cache
+            ):
+                cleaned = cleaner.feed(chunk)
+                if cleaned:
+                    yield cleaned
+            
+            tail = cleaner.flush()
+            if tail:
+                yield tail
+                
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            raise Exception(f"Error streaming content with Gemini: {str(e)}")
+    
+    def _build_subpoint_prompt(
+        self,
+        topic: str,
+        section_title: str,
+        context: str,
+        count: int
+    ) -> str:
+        return f"""
+You are planning a long section of a professional document.
+
+Document Topic: {topic}
+Section Title: {section_title}
+{f'Previous Sections Context: {context}' if context else ''}
+
+Generate {count} sub-point titles that divide this section into parts of roughly equal weight, in logical reading order.
+Each sub-point must cover distinct material with no overlap between them.
+
+IMPORTANT: Return ONLY the sub-point titles, one per line, without numbering, bullets or any formatting.
+"""
+    
+    def _parse_subpoints(self, text: str) -> List[str]:
+        """
+        Sub-point titles from a planning response, with numbering and bullets removed
+        """
+        subpoints = []
+        for line in text.strip().split('\n'):
+            cleaned = re.sub(r'^\s*(?:\d+[\.\)\-]\s*|[•\-*→►]\s*)', '', line).strip()
+            cleaned = self._clean_paragraph_content(cleaned)
+            if cleaned:
+                subpoints.append(cleaned)
+        return subpoints
+    
+    def _build_chunk_prompt(
+        self,
+        topic: str,
+        section_title: str,
+        context: str,
+        subpoints: List[str],
+        index: int,
+        word_count: int
+    ) -> str:
+        plan = "\n".join(
+            f"{idx + 1}. {subpoint}{' (this part)' if idx == index else ''}"
+            for idx, subpoint in enumerate(subpoints)
+        )
+        if index == 0:
+            opening = "Open with a brief introduction to the section"
+        else:
+            opening = "Continue directly from the previous part; do not introduce the section again"
+        if index == len(subpoints) - 1:
+            closing = "End by drawing the section to a close"
+        else:
+            closing = "Do not write a conclusion; the next part continues the section"
+        
+        return f"""
+You are a professional technical writer writing one part of a long document section.
+
+Document Topic: {topic}
+Section Title: {section_title}
+{f'Previous Sections Context: {context}' if context else ''}
+
+Section plan:
+{plan}
+
+Write part {index + 1} of {len(subpoints)}, covering only: {subpoints[index]}
+- Write approximately {word_count} words
+- Use clear, formal language
+- Include relevant details and examples
+- Do not cover the other parts of the plan
+- {opening}
+- {closing}
+
+IMPORTANT: Return ONLY clean paragraph text without any markdown formatting (no *, #, **, etc.).
+Do not include the section title or sub-point titles.
+Use natural paragraph breaks (blank line between paragraphs).
+"""
+    
+    def _stitch_chunks(self, chunks: List[str]) -> str:
+        """
+        Join separately written chunks of a section into one text
+        
+        Smooths each seam locally: drops re-introductions at the start of a
+        later chunk, early conclusions at the end of a non-final chunk, and
+        an opening sentence that restates the previous chunk's last one.
+        """
+        stitched: List[str] = []
+        for idx, chunk in enumerate(chunks):
+            paragraphs = [p.strip() for p in re.split(r'\n\s*\n', chunk) if p.strip()]
+            if idx < len(chunks) - 1:
+                while len(paragraphs) > 1 and _CHUNK_CONCLUSION_PATTERN.match(paragraphs[-1]):
+                    paragraphs.pop()
+            if idx > 0 and paragraphs:
+                first = _CHUNK_INTRO_PATTERN.sub('', paragraphs[0], count=1)
+                
+                previous = split_sentences(stitched[-1]) if stitched else []
+                opening = split_sentences(first)
+                if previous and opening:
+                    last_words = set(content_words(previous[-1]))
+                    first_words = set(content_words(opening[0]))
+                    union = last_words | first_words
+                    if union and len(last_words & first_words) / len(union) > _RESTATEMENT_OVERLAP:
+                        first = first[len(opening[0]):].strip()
+                
+                paragraphs[0] = first
+            stitched.extend(p for p in paragraphs if p)
+        
+        return self._clean_paragraph_content("\n\n".join(stitched))
+    
+    async def generate_long_section_content(
+        self,
+        topic: str,
+        section_title: str,
+        context: str = "",
+        word_count: int = 2000,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Generate a long document section as concurrently written chunks
+        
+        The section is first planned into sub-points, one chunk of about
+        long_section_chunk_words each, and the chunks are written in parallel
+        so latency follows the chunk size rather than the section length.
+        
+        Args:
+            topic: Main topic of the document
+            section_title: Title of the section
+            context: Previous sections context (used for planning and the first chunk)
+            word_count: Target word count for the whole section
+            use_cache: False to bypass cached responses
+            
+        Returns:
+            Stitched and cleaned section content
+        """
+        try:
+            count = max(2, math.ceil(word_count / settings.long_section_chunk_words))
+            plan_text = await self._generate(
+                self._build_subpoint_prompt(topic, section_title, context, count),
+                expected_output_tokens=count * 20,
+                use_cache=use_cache
+            )
+            subpoints = self._parse_subpoints(plan_text)[:count]
+            if not subpoints:
+                raise Exception("Could not plan sub-points for the section")
+            
+            chunk_words = math.ceil(word_count / len(subpoints))
+            semaphore = asyncio.Semaphore(max(1, settings.long_section_concurrency))
+            
+            async def write_chunk(index: int) -> str:
+                prompt = self._build_chunk_prompt(
+                    topic,
+                    section_title,
+                    context if index == 0 else "",
+                    subpoints,
+                    index,
+                    chunk_words
+                )
+                async with semaphore:
+                    text = await self._generate(
+                        prompt,
+                        expected_output_tokens=chunk_words * 2,
+                        use_cache=use_cache
+                    )
+                return self._clean_paragraph_content(text.strip())
+            
+            tasks = [asyncio.ensure_future(write_chunk(idx)) for idx in range(len(subpoints))]
+            try:
+                chunks = await asyncio.gather(*tasks)
+            except BaseException:
+                # One chunk failing sinks the section; stop paying for the rest
+                for task in tasks:
+                    task.cancel()
+                raise
+            
+            return self._stitch_chunks(chunks)
+            
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating long section with Gemini: {str(e)}")
+    
+    def _build_document_prompt(
+        self,
+        topic: str,
+        section_titles: List[str],
+        document_type: str,
+        word_count: int
+    ) -> str:
+        """
+        Render a prompt asking for every section of an outline in one response
+        """
+        outline = "\n".join(
+            f"{idx + 1}. {title}" for idx, title in enumerate(section_titles)
+        )
+        
+        if document_type == "pptx":
+            return f"""
+You are a professional presentation content writer. Create concise, impactful slide content.
+
+Presentation Topic: {topic}
+
+Write the content for every slide of this outline:
+{outline}
+
+For each slide:
+- Use 3-5 bullet points maximum
+- Keep each point concise (1-2 sentences max)
+- Focus on key insights and takeaways
+- Use professional but engaging language
+- Ensure content flows logically from slide to slide
+
+FORMAT: Begin each slide with its marker line, exactly as shown, followed by its bullet points:
+=== SECTION 1 ===
+=== SECTION 2 ===
+...and so on for all {len(section_titles)} slides, in order.
+
+IMPORTANT: Return ONLY the marker lines and bullet points, one per line, without any markdown symbols (*, -, •, etc.), numbering, or formatting.
+Do not include the slide titles.
+"""
+        # docx
+        return f"""
+You are a professional technical writer creating high-quality document content.
+
+Document Topic: {topic}
+
+Write the content for every section of this document outline:
+{outline}
+
+For each section:
+- Write approximately {word_count} words
+- Use clear, formal language
+- Include relevant details and examples
+- Ensure smooth transitions between sections
+- Maintain consistent tone throughout
+- Structure content with proper paragraphs
+
+FORMAT: Begin each section with its marker line, exactly as shown, followed by its content:
+=== SECTION 1 ===
+=== SECTION 2 ===
+...and so on for all {len(section_titles)} sections, in order.
+
+IMPORTANT: Apart from the marker lines, return ONLY clean paragraph text without any markdown formatting (no *, #, **, etc.).
+Do not include the section titles.
+Use natural paragraph breaks (blank line between paragraphs).
+"""
+    
+    def parse_document_sections(
+        self,
+        text: str,
+        section_count: int,
+        document_type: str = "docx",
+        word_count: int = 250
+    ) -> Dict[int, str]:
+        """
+        Split a whole-document response back into per-section content
+        
+        Args:
+            text: Raw response containing "=== SECTION n ===" markers
+            section_count: Number of sections that were requested
+            document_type: Type of document (docx/pptx)
+            word_count: Target word count each section was asked for
+            
+        Returns:
+            Cleaned content keyed by 0-based section index. Sections that are
+            missing, duplicated, empty or far too short are left out.
+        """
+        markers = list(SECTION_MARKER_PATTERN.finditer(text))
+        sections: Dict[int, str] = {}
+        seen = set()
+        
+        for idx, marker in enumerate(markers):
+            index = int(marker.group(1)) - 1
+            end = markers[idx + 1].start() if idx + 1 < len(markers) else len(text)
+            
+            # Out of range or repeated markers make the split ambiguous
+            if index < 0 or index >= section_count or index in seen:
+                sections.pop(index, None)
+                seen.add(index)
+                continue
+            seen.add(index)
+            
+            body = text[marker.end():end].strip()
+            if document_type == "pptx":
+                content = self._clean_bullet_content(body)
+                usable = bool(content)
+            else:
+                content = self._clean_paragraph_content(body)
+                usable = len(content.split()) >= max(20, word_count // 4)
+            
+            if usable:
+                sections[index] = content
+        
+        return sections
+    
+    async def generate_document_content(
+        self,
+        topic: str,
+        section_titles: List[str],
+        document_type: str = "docx",
+        word_count: int = 250,
+        use_cache: bool = True
+    ) -> Dict[int, str]:
+        """
+        Generate all sections of a document with a single Gemini call
+        
+        Args:
+            topic: Main topic of the document
+            section_titles: Section titles in document order
+            document_type: Type of document (docx/pptx)
+            word_count: Target word count per section
+            use_cache: False to bypass cached responses
+            
+        Returns:
+            Cleaned content keyed by 0-based section index; sections that came
+            back missing or malformed are absent and should be re-requested
+        """
+        try:
+            prompt = self._build_document_prompt(
+                topic, section_titles, document_type, word_count
+            )
+            
+            response_text = await self._generate(
+                prompt,
+                expected_output_tokens=word_count * 2 * len(section_titles),
+                use_cache=use_cache
+            )
+            
+            return self.parse_document_sections(
+                response_text,
+                len(section_titles),
+                document_type=document_type,
+                word_count=word_count
+            )
+            
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating document with Gemini: {str(e)}")
+    
     def _clean_bullet_content(self, text: str) -> str:
         """
         Clean bullet point content by removing markdown symbols
@@ -214,11 +958,19 @@ Write in plain text format ready for direct insertion into a document.
         
         return titles
     
+    def _outline_cache_key(self, topic: str, document_type: str, section_count: int) -> str:
+        """
+        Cache key for an outline: topic folded for case and whitespace, plus type and count
+        """
+        normalized_topic = " ".join(topic.casefold().split())
+        return f"{document_type}:{section_count}:{normalized_topic}"
+    
     async def generate_outline(
         self,
         topic: str,
         document_type: str = "docx",
-        section_count: int = 5
+        section_count: int = 5,
+        use_cache: bool = True
     ) -> List[str]:
         """
         Generate document outline/structure using Gemini API
@@ -227,10 +979,18 @@ Write in plain text format ready for direct insertion into a document.
             topic: Main topic of the document
             document_type: Type of document (docx/pptx)
             section_count: Number of sections/slides to generate
+            use_cache: False to bypass cached responses
             
         Returns:
             List of section/slide titles (max 36 characters each)
         """
+        # Near-identical topics share one parsed outline
+        outline_key = self._outline_cache_key(topic, document_type, section_count)
+        if use_cache:
+            cached_titles = self.outline_cache.get(outline_key)
+            if cached_titles is not None:
+                return list(cached_titles)
+        
         try:
             if document_type == "pptx":
                 prompt = f"""
@@ -287,24 +1047,97 @@ Example format:
 Generate {section_count} section titles now. Output ONLY the numbered list, nothing else. Remember: MAX 36 characters per title:
 """
 
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.model.generate_content(prompt)
+            response_text = await self._generate(
+                prompt,
+                expected_output_tokens=section_count * 20,
+                use_cache=use_cache
             )
             
             # Parse the response to extract titles
-            titles = self.parse_outline(response.text)
+            titles = self.parse_outline(response_text)
             
             # Return exactly section_count titles (or pad if fewer)
             if len(titles) < section_count:
                 for i in range(len(titles), section_count):
                     titles.append(f"Section {i + 1}")
             
-            return titles[:section_count]
+            titles = titles[:section_count]
+            self.outline_cache.set(outline_key, tuple(titles))
             
+            return titles
+            
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
         except Exception as e:
             raise Exception(f"Error generating outline with Gemini: {str(e)}")
 
+    async def refine_content(
+        self,
+        content: str,
+        refinement_request: str,
+        use_cache: bool = True,
+        hedge: bool = False
+    ) -> str:
+        """
+        Rewrite existing content according to a user's refinement request
+        
+        Args:
+            content: Current section content
+            refinement_request: What the user wants changed
+            use_cache: False to bypass cached responses
+            hedge: Hedge a slow call with a duplicate (interactive requests)
+            
+        Returns:
+            Refined content as string
+        """
+        try:
+            prompt = f"""
+You are refining existing content based on user feedback.
+
+Original Content:
+{content}
+
+User's Refinement Request:
+{refinement_request}
+
+Generate improved content that:
+- Addresses the user's specific refinement request
+- Maintains the overall structure and flow
+- Keeps approximately the same length
+- Improves quality based on the feedback
+- Stays relevant to the section topic
+
+Generate only the refined content, no additional formatting or explanations.
+"""
+            
+            response_text = await self._generate(
+                prompt,
+                expected_output_tokens=estimate_tokens(content),
+                use_cache=use_cache,
+                hedge=hedge
+            )
+            
+            return response_text.strip()
+            
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            raise Exception(f"Error refining content with Gemini: {str(e)}")
+    
+    def stats(self) -> dict:
+        """
+        Runtime metrics for the LLM call path
+        """
+        return {
+            "rate_limiter": self.rate_limiter.stats(),
+            "cache": self.cache.stats() if self.cache else None,
+            "outline_cache": self.outline_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+            "retries": self.retry_policy.stats(),
+            "circuit_breaker": self.circuit_breaker.stats(),
+            "hedging": self.hedger.stats(),
+            "backend": self.backend.stats()
+        }
+
 # Create singleton instance
 gemini_service = GeminiService()
@@ -0,0 +1,372 @@
+from typing import Dict, List, NamedTuple, Optional, Callable, Awaitable
+import asyncio
+from config import get_settings
+from database import SessionLocal
+from models import Project, Section
+from services.gemini_service import gemini_service
+from services.jobs import Job, create_job_backend
+from services.resilience import CircuitOpenError
+from services.deadline import DeadlineExceeded, current_deadline
+from services.summarizer import set_section_content, summarize
+from services.context_packer import ContextSource
+
+settings = get_settings()
+
+GENERATION_MODES = ["sequential", "concurrent", "single_call"]
+
+class SectionPlan(NamedTuple):
+    """Plain snapshot of a section, safe to use after its DB session is closed"""
+    id: int
+    title: str
+    order: int
+    content: Optional[str] = None
+    is_stale: bool = False
+    summary: Optional[str] = None
+
+    @property
+    def needs_generation(self) -> bool:
+        """True when the section has no usable content yet"""
+        return self.is_stale or not (self.content or "").strip()
+
+def plan_sections(sections) -> List[SectionPlan]:
+    """
+    Snapshot Section rows in document order
+    """
+    return [
+        SectionPlan(
+            section.id,
+            section.title,
+            section.order,
+            section.content,
+            bool(section.is_stale),
+            section.summary
+        )
+        for section in sorted(sections, key=lambda x: x.order)
+    ]
+
+def section_summary(section) -> str:
+    """
+    Stored summary of a section (row or SectionPlan), summarizing on the fly
+    for content saved before summaries were kept
+    """
+    return section.summary or summarize(section.content, settings.section_summary_max_words)
+
+def context_source(section) -> ContextSource:
+    """
+    Offer a written section (row or SectionPlan) as context for later ones
+    """
+    return ContextSource(section.title, section_summary(section), section.content or "")
+
+class SectionGenerationError(Exception):
+    """Raised when generating one section of a document fails"""
+    def __init__(self, section: SectionPlan, cause: Exception):
+        super().__init__(f"Error generating content for section '{section.title}': {str(cause)}")
+        self.section = section
+
+def validate_generation_mode(mode: str, section_count: int, word_count: Optional[int] = None) -> Optional[str]:
+    """
+    Check a generation mode against the document size
+
+    Returns:
+        An error message, or None when the mode can be used
+    """
+    if mode not in GENERATION_MODES:
+        return "Invalid generation mode. Must be 'sequential', 'concurrent' or 'single_call'"
+    if mode == "single_call" and section_count > settings.single_call_max_sections:
+        return f"Single-call mode supports at most {settings.single_call_max_sections} sections"
+    if mode == "single_call" and word_count and word_count >= settings.long_section_threshold_words:
+        return "Single-call mode does not support long sections"
+    return None
+
+def validate_word_count(word_count: Optional[int]) -> Optional[str]:
+    """
+    Check a requested per-section word count
+
+    Returns:
+        An error message, or None when the word count can be used
+    """
+    if word_count is not None and not 50 <= word_count <= settings.max_section_words:
+        return f"word_count must be between 50 and {settings.max_section_words}"
+    return None
+
+def section_word_count(document_type: str, requested: Optional[int] = None) -> int:
+    """
+    Target word count for a generated section of the given document type,
+    unless the caller asked for a specific length
+    """
+    if requested is not None:
+        return requested
+    return 300 if document_type == "docx" else 150
+
+def build_outline_context(titles: List[str], current_index: int) -> str:
+    """
+    Describe the whole document outline so a section can be written
+    without waiting for the content of the sections before it
+    """
+    lines = []
+    for idx, title in enumerate(titles):
+        marker = " (this section)" if idx == current_index else ""
+        lines.append(f"{idx + 1}. {title}{marker}")
+    return "Document outline:\n" + "\n".join(lines)
+
+async def gather_cancelling(coros) -> list:
+    """
+    Run coroutines concurrently, cancelling the rest as soon as one fails
+    """
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        # Stop spending tokens on the remaining sections once one has failed
+        for task in tasks:
+            task.cancel()
+        raise
+
+async def generate_sections(
+    topic: str,
+    document_type: str,
+    sections: List[SectionPlan],
+    mode: str = "sequential",
+    use_cache: bool = True,
+    on_section_start: Optional[Callable[[SectionPlan], Awaitable[None]]] = None,
+    on_section_complete: Optional[Callable[[SectionPlan, str], Awaitable[None]]] = None,
+    on_section_chunk: Optional[Callable[[SectionPlan, str], Awaitable[None]]] = None,
+    resume: bool = False,
+    word_count: Optional[int] = None,
+    prefetched: Optional[Dict[int, str]] = None
+) -> List[Optional[str]]:
+    """
+    Generate content for every section of a document
+
+    When the current request deadline runs out the sections finished so far
+    are kept and the rest are left as None instead of failing the whole run.
+    With resume=True only empty or stale sections are generated; the stored
+    content of the others is kept and used as context.
+
+    Args:
+        topic: Main topic of the document
+        document_type: Type of document (docx/pptx)
+        sections: Sections to generate, in document order
+        mode: "sequential" (each section sees the previous ones),
+            "concurrent" (sections generated in parallel from the outline) or
+            "single_call" (the whole outline in one request)
+        use_cache: False to bypass cached LLM responses
+        on_section_start: Awaited before a section is sent to Gemini
+        on_section_complete: Awaited with each section's content as it finishes
+        on_section_chunk: Awaited with each piece of a section's content as it
+            arrives; sections are streamed from Gemini when this is given, and
+            content that arrives whole (prefetched, single-call, long sections)
+            is passed as one piece
+        resume: Only generate sections that need it (see SectionPlan.needs_generation)
+        word_count: Target words per section instead of the document type's default;
+            long docx sections are written in concurrent chunks
+        prefetched: Content already generated for some sections, by position
+            in `sections` (e.g. speculatively after the outline), used instead
+            of a new call
+
+    Returns:
+        Generated content (None where the deadline cut it short), in the
+        same order as `sections`
+    """
+    word_count = section_word_count(document_type, word_count)
+    titles = [section.title for section in sections]
+    pending = [
+        idx for idx, section in enumerate(sections)
+        if not resume or section.needs_generation
+    ]
+    contents: List[Optional[str]] = [
+        None if idx in pending else section.content
+        for idx, section in enumerate(sections)
+    ]
+
+    async def deliver(section: SectionPlan, content: str):
+        # For content that did not come from a stream
+        if on_section_chunk:
+            await on_section_chunk(section, content)
+        if on_section_complete:
+            await on_section_complete(section, content)
+
+    # Adopt prefetched content first so it can serve as context below
+    adopted = set()
+    for index in pending:
+        section = sections[index]
+        if prefetched and index in prefetched:
+            if on_section_start:
+                await on_section_start(section)
+            contents[index] = prefetched[index]
+            adopted.add(index)
+            await deliver(section, contents[index])
+    pending = [idx for idx in pending if idx not in adopted]
+
+    if not pending:
+        return contents
+
+    def out_of_time() -> bool:
+        deadline = current_deadline()
+        return deadline is not None and deadline.expired
+
+    async def generate_one(
+        index: int,
+        context: str = "",
+        context_sources: Optional[List[ContextSource]] = None
+    ) -> Optional[str]:
+        section = sections[index]
+        if out_of_time():
+            return None
+        if on_section_start:
+            await on_section_start(section)
+        try:
+            if on_section_chunk:
+                parts = []
+                async for chunk in gemini_service.stream_section_content(
+                    topic=topic,
+                    section_title=section.title,
+                    document_type=document_type,
+                    context=context,
+                    word_count=word_count,
+                    use_cache=use_cache,
+                    context_sources=context_sources
+                ):
+                    parts.append(chunk)
+                    await on_section_chunk(section, chunk)
+                content = "".join(parts)
+            else:
+                content = await gemini_service.generate_section_content(
+                    topic=topic,
+                    section_title=section.title,
+                    document_type=document_type,
+                    context=context,
+                    word_count=word_count,
+                    use_cache=use_cache,
+                    context_sources=context_sources
+                )
+        except CircuitOpenError:
+            raise
+        except DeadlineExceeded:
+            return None
+        except Exception as e:
+            raise SectionGenerationError(section, e)
+        if on_section_complete:
+            await on_section_complete(section, content)
+        return content
+
+    semaphore = asyncio.Semaphore(max(1, settings.generation_concurrency))
+
+    async def bounded(index: int) -> Optional[str]:
+        async with semaphore:
+            return await generate_one(index, build_outline_context(titles, index))
+
+    if mode == "concurrent":
+        results = await gather_cancelling([bounded(idx) for idx in pending])
+        for index, content in zip(pending, results):
+            contents[index] = content
+        return contents
+
+    if mode == "single_call":
+        if on_section_start:
+            for index in pending:
+                await on_section_start(sections[index])
+
+        try:
+            parsed = await gemini_service.generate_document_content(
+                topic=topic,
+                section_titles=[titles[idx] for idx in pending],
+                document_type=document_type,
+                word_count=word_count,
+                use_cache=use_cache
+            )
+        except DeadlineExceeded:
+            parsed = {}
+        # Parsed sections are numbered within the pending list
+        parsed = {pending[position]: content for position, content in parsed.items()}
+        for index in sorted(parsed):
+            contents[index] = parsed[index]
+            await deliver(sections[index], parsed[index])
+
+        # Only sections that came back missing or malformed cost another call
+        missing = [idx for idx in pending if idx not in parsed]
+        retried = await gather_cancelling([bounded(idx) for idx in missing])
+        for index, content in zip(missing, retried):
+            contents[index] = content
+
+        return contents
+
+    written: List[ContextSource] = []  # Sections before the current one
+    for index, section in enumerate(sections):
+        if index in pending:
+            content = await generate_one(index, context_sources=list(written))
+            if content is None:
+                # Out of time: leave this and the remaining sections unwritten
+                break
+            contents[index] = content
+            written.append(context_source(section._replace(content=content, summary=None)))
+        elif index in adopted:
+            written.append(context_source(section._replace(content=contents[index], summary=None)))
+        else:
+            written.append(context_source(section))
+
+    return contents
+
+def _save_section_content(section_id: int, content: str):
+    """
+    Write one section's content in its own short transaction
+    """
+    db = SessionLocal()
+    try:
+        section = db.query(Section).filter(Section.id == section_id).first()
+        if section:
+            set_section_content(section, content)
+            section.is_stale = False
+            db.commit()
+    finally:
+        db.close()
+
+async def run_generation_job(job: Job):
+    """
+    Worker entry point: generate a project's sections outside any request
+
+    The DB session is only held while loading the outline and while
+    saving each finished section, never across an LLM call.
+    """
+    db = SessionLocal()
+    try:
+        project = db.query(Project).filter(Project.id == job.project_id).first()
+        if not project:
+            raise Exception("Project not found")
+        topic = project.topic
+        document_type = project.document_type.value
+        sections = plan_sections(project.sections)
+    finally:
+        db.close()
+
+    if job.resume:
+        # Sections that already have content are done before the job starts
+        for section in sections:
+            if not section.needs_generation:
+                job.update_section(section.id, "completed")
+
+    async def on_start(section: SectionPlan):
+        job.update_section(section.id, "running")
+
+    async def on_complete(section: SectionPlan, content: str):
+        _save_section_content(section.id, content)
+        job.update_section(section.id, "completed")
+
+    await generate_sections(
+        topic,
+        document_type,
+        sections,
+        mode=job.mode,
+        use_cache=not job.fresh,
+        on_section_start=on_start,
+        on_section_complete=on_complete,
+        resume=job.resume
+    )
+
+# Shared job backend for project generation
+generation_jobs = create_job_backend(
+    settings.job_backend,
+    runner=run_generation_job,
+    workers=settings.job_workers,
+    retention_seconds=settings.job_retention_seconds
+)
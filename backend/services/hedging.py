@@ -0,0 +1,103 @@
+from typing import Awaitable, Callable, Optional, TypeVar
+import asyncio
+import time
+from services.llm_executor import LatencyRecorder
+
+T = TypeVar("T")
+
+class Hedger:
+    """
+    Hedge slow calls with a duplicate and keep whichever finishes first
+
+    A call that is still running after the `percentile` latency of recent
+    calls gets a backup; the loser is cancelled. Backups are capped at
+    `max_ratio` of all calls so a slow upstream is not hit with double load.
+
+    Only hedgeable calls are timed and counted: outline, whole-document and
+    chunk calls run much longer than interactive ones and would push the
+    hedge delay past the point where hedging helps.
+    """
+    def __init__(self, percentile: float = 95, max_ratio: float = 0.1, min_samples: int = 20):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.latency = LatencyRecorder()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging, or None while there are too few samples
+        """
+        if self.latency.count < self.min_samples:
+            return None
+        return self.latency.percentile(self.percentile)
+
+    async def _timed(self, fn: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await fn()
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    async def run(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        backup: Optional[Callable[[], Awaitable[T]]] = None,
+        hedge: bool = False
+    ) -> T:
+        """
+        Await `fn()`, racing it against `backup()` once it runs past the hedge delay
+
+        Args:
+            fn: Primary call
+            backup: Duplicate call to fire when hedging; defaults to `fn`
+            hedge: Whether this call may be hedged at all; other calls are
+                neither timed nor counted
+
+        Returns:
+            Result of the first call to succeed
+        """
+        if not hedge:
+            return await fn()
+
+        self.calls += 1
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(fn)
+
+        primary = asyncio.ensure_future(self._timed(fn))
+        secondary = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or self.hedged >= self.max_ratio * self.calls:
+                return await primary
+
+            self.hedged += 1
+            secondary = asyncio.ensure_future(self._timed(backup or fn))
+            pending = {primary, secondary}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self.hedge_wins += 1
+                        return task.result()
+
+            # Both calls failed; surface the primary's error
+            return primary.result()
+        finally:
+            for task in (primary, secondary):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        return {
+            "percentile": self.percentile,
+            "hedge_delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "latency": self.latency.stats()
+        }
@@ -0,0 +1,209 @@
+from typing import List, Dict, Optional, Callable, Awaitable, Tuple
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import asyncio
+import time
+import uuid
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class Job:
+    """
+    A long-running generation job and its per-section progress
+
+    Progress changes are published to subscribers as events so clients can
+    follow a job live instead of polling.
+    """
+    def __init__(
+        self,
+        user_id: int,
+        project_id: int,
+        mode: str,
+        sections: List[Tuple[int, str, int]],
+        fresh: bool = False,
+        resume: bool = False
+    ):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.project_id = project_id
+        self.mode = mode
+        self.fresh = fresh
+        self.resume = resume
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.sections = {
+            section_id: {"section_id": section_id, "title": title, "order": order, "status": JOB_QUEUED}
+            for section_id, title, order in sections
+        }
+        self.created_at = datetime.now(timezone.utc)
+        self.updated_at = self.created_at
+        self.finished_at: Optional[float] = None
+        self._subscribers: List[asyncio.Queue] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self, event: str, data: dict):
+        self.updated_at = datetime.now(timezone.utc)
+        for queue in self._subscribers:
+            queue.put_nowait({"event": event, "data": data})
+
+    def update_section(self, section_id: int, status: str):
+        if section_id in self.sections:
+            self.sections[section_id]["status"] = status
+            self.publish(f"section_{status}", dict(self.sections[section_id]))
+
+    def mark_running(self):
+        self.status = JOB_RUNNING
+        self.publish(JOB_RUNNING, {"job_id": self.id})
+
+    def mark_completed(self):
+        self.status = JOB_COMPLETED
+        self.finished_at = time.monotonic()
+        self.publish(JOB_COMPLETED, {"job_id": self.id})
+
+    def mark_failed(self, error: str):
+        self.status = JOB_FAILED
+        self.error = error
+        self.finished_at = time.monotonic()
+        for section in self.sections.values():
+            if section["status"] in (JOB_QUEUED, JOB_RUNNING):
+                section["status"] = JOB_FAILED
+        self.publish(JOB_FAILED, {"job_id": self.id, "error": error})
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "project_id": self.project_id,
+            "mode": self.mode,
+            "status": self.status,
+            "error": self.error,
+            "sections": sorted(
+                (dict(section) for section in self.sections.values()),
+                key=lambda x: x["order"]
+            ),
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+JobRunner = Callable[[Job], Awaitable[None]]
+
+class JobBackend(ABC):
+    """
+    Interface for job execution backends
+
+    A backend owns both the queue of pending jobs and the lookup of job
+    state, so an out-of-process backend can keep them in shared storage.
+    """
+    def __init__(self, runner: JobRunner):
+        self.runner = runner
+
+    @abstractmethod
+    async def submit(self, job: Job) -> Job:
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+class InProcessJobBackend(JobBackend):
+    """
+    Runs jobs on a fixed pool of asyncio worker tasks in this process
+    """
+    def __init__(self, runner: JobRunner, workers: int = 2, retention_seconds: int = 3600):
+        super().__init__(runner)
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._running = 0
+
+    def _start(self):
+        # Workers are created lazily so they bind to the server's event loop
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def submit(self, job: Job) -> Job:
+        self._start()
+        self._prune()
+        self._jobs[job.id] = job
+        await self._queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            try:
+                job.mark_running()
+                await self.runner(job)
+                job.mark_completed()
+            except asyncio.CancelledError:
+                job.mark_failed("Job cancelled")
+                raise
+            except Exception as e:
+                job.mark_failed(str(e))
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "backend": "inprocess",
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+            "tracked_jobs": len(self._jobs)
+        }
+
+JOB_BACKENDS = {
+    "inprocess": InProcessJobBackend,
+}
+
+def create_job_backend(name: str, runner: JobRunner, **options) -> JobBackend:
+    """
+    Build the job backend registered under `name`
+    """
+    if name not in JOB_BACKENDS:
+        raise ValueError(f"Unknown job backend '{name}'. Must be one of: {', '.join(JOB_BACKENDS)}")
+    return JOB_BACKENDS[name](runner, **options)
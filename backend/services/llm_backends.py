@@ -0,0 +1,334 @@
+from typing import AsyncIterator, Optional, Union
+from abc import ABC, abstractmethod
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from services.llm_executor import BoundedExecutor, LatencyRecorder
+from services.rate_limiter import estimate_tokens
+
+class LLMResponse:
+    """Text of a completed LLM call and the tokens it used (0 if unknown)"""
+    def __init__(self, text: str, total_tokens: int = 0):
+        self.text = text
+        self.total_tokens = total_tokens
+
+class StreamEnd:
+    """Last item of a backend stream, carrying the call's token usage"""
+    def __init__(self, total_tokens: int = 0):
+        self.total_tokens = total_tokens
+
+class LLMBackendError(Exception):
+    """Error raised by a backend, with the upstream HTTP status when known"""
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+class LLMBackend(ABC):
+    """
+    Interface for the model behind GeminiService
+
+    Backends only make raw calls; rate limiting, caching and request
+    coalescing stay in GeminiService so every backend gets them.
+    """
+    model_name = ""
+
+    @abstractmethod
+    async def generate(self, prompt: str) -> LLMResponse:
+        ...
+
+    @abstractmethod
+    def stream(self, prompt: str) -> AsyncIterator[Union[str, StreamEnd]]:
+        """
+        Yield text chunks as they are produced, then a single StreamEnd
+        """
+
+    def shutdown(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+def _usage_tokens(response) -> int:
+    """Total tokens Gemini reports for a response, or 0 when unavailable"""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", 0) if usage else 0
+
+class GeminiBackend(LLMBackend):
+    """
+    Google Gemini via the google-generativeai SDK
+
+    Uses the SDK's native async client when available; blocking calls
+    otherwise run on a dedicated executor rather than the event loop's
+    shared default pool.
+    """
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gemini-2.5-flash",
+        use_async: bool = True,
+        executor_workers: int = 32
+    ):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.use_async = use_async and hasattr(self.model, "generate_content_async")
+        self.executor = BoundedExecutor(executor_workers, name="gemini")
+        self.async_latency = LatencyRecorder()
+        self._async_in_flight = 0
+
+    async def generate(self, prompt: str) -> LLMResponse:
+        if not self.use_async:
+            response = await self.executor.run(lambda: self.model.generate_content(prompt))
+            return LLMResponse(response.text, _usage_tokens(response))
+
+        started = time.monotonic()
+        self._async_in_flight += 1
+        try:
+            response = await self.model.generate_content_async(prompt)
+            return LLMResponse(response.text, _usage_tokens(response))
+        finally:
+            self._async_in_flight -= 1
+            self.async_latency.record(time.monotonic() - started)
+
+    def stream(self, prompt: str) -> AsyncIterator[Union[str, StreamEnd]]:
+        if self.use_async:
+            return self._stream_native(prompt)
+        return self._stream_in_executor(prompt)
+
+    async def _stream_native(self, prompt: str) -> AsyncIterator[Union[str, StreamEnd]]:
+        started = time.monotonic()
+        self._async_in_flight += 1
+        try:
+            response = await self.model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                if chunk.parts:
+                    yield chunk.text
+            yield StreamEnd(_usage_tokens(response))
+        finally:
+            self._async_in_flight -= 1
+            self.async_latency.record(time.monotonic() - started)
+
+    async def _stream_in_executor(self, prompt: str) -> AsyncIterator[Union[str, StreamEnd]]:
+        """
+        Run the blocking SDK iterator on the executor, handing chunks back
+        to the event loop through a queue
+        """
+        loop = asyncio.get_event_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                response = self.model.generate_content(prompt, stream=True)
+                for chunk in response:
+                    if stop.is_set():
+                        break
+                    if chunk.parts:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.text)
+                loop.call_soon_threadsafe(queue.put_nowait, StreamEnd(_usage_tokens(response)))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        asyncio.ensure_future(self.executor.run(produce))
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                if isinstance(item, StreamEnd):
+                    break
+        finally:
+            stop.set()
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "gemini",
+            "model": self.model_name,
+            "mode": "async" if self.use_async else "executor",
+            "async_in_flight": self._async_in_flight,
+            "async_latency": self.async_latency.stats(),
+            "executor": self.executor.stats()
+        }
+
+_STUB_WORDS = (
+    "analysis approach benefit capacity context data delivery design efficiency "
+    "framework growth impact insight integration market method model outcome "
+    "performance planning process quality research resource result risk scale "
+    "strategy structure system team technology value workflow"
+).split()
+
+class StubBackend(LLMBackend):
+    """
+    Local stand-in for Gemini, for load tests and benchmarks
+
+    Responses are deterministic for a given prompt and shaped to satisfy
+    the service's parsers (outlines, section markers, bullets, paragraphs).
+    Latency, throughput and failures are simulated from configuration.
+    """
+    LATENCY_DISTRIBUTIONS = ["fixed", "uniform", "lognormal", "exponential"]
+
+    def __init__(
+        self,
+        latency_distribution: str = "lognormal",
+        latency_ms: float = 800,
+        latency_jitter: float = 0.5,
+        tokens_per_second: float = 80,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        seed: Optional[int] = None
+    ):
+        if latency_distribution not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown stub latency distribution '{latency_distribution}'. "
+                f"Must be one of: {', '.join(self.LATENCY_DISTRIBUTIONS)}"
+            )
+        self.model_name = "stub"
+        self.latency_distribution = latency_distribution
+        self.latency_seconds = latency_ms / 1000
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = max(tokens_per_second, 1e-6)
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._random = random.Random(seed)
+        self.latency = LatencyRecorder()
+        self.calls = 0
+        self.failures = 0
+        self._in_flight = 0
+
+    def _first_token_latency(self) -> float:
+        """
+        Sample time-to-first-token; latency_ms is the fixed value, the mean
+        (uniform, exponential) or the median (lognormal)
+        """
+        base = self.latency_seconds
+        if self.latency_distribution == "fixed":
+            return base
+        if self.latency_distribution == "uniform":
+            return max(0.0, base * (1 + self._random.uniform(-self.latency_jitter, self.latency_jitter)))
+        if self.latency_distribution == "exponential":
+            return self._random.expovariate(1 / base) if base > 0 else 0.0
+        return base * math.exp(self._random.gauss(0, self.latency_jitter))
+
+    def _maybe_fail(self):
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise LLMBackendError("Injected stub failure", status_code=self.failure_status)
+
+    def render(self, prompt: str) -> str:
+        """
+        Deterministic response text for a prompt
+        """
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+
+        def sentence() -> str:
+            words = [rng.choice(_STUB_WORDS) for _ in range(rng.randint(10, 18))]
+            return " ".join(words).capitalize() + "."
+
+        def paragraphs(word_count: int) -> str:
+            blocks, written = [], 0
+            while written < word_count:
+                block = " ".join(sentence() for _ in range(rng.randint(3, 5)))
+                blocks.append(block)
+                written += len(block.split())
+            return "\n\n".join(blocks)
+
+        def bullets() -> str:
+            return "\n".join(sentence() for _ in range(rng.randint(3, 5)))
+
+        word_match = re.search(r'approximately (\d+) words', prompt)
+        word_count = int(word_match.group(1)) if word_match else 200
+        is_slides = "bullet point" in prompt
+
+        document_match = re.search(r'for all (\d+) (?:sections|slides)', prompt)
+        if document_match:
+            parts = []
+            for idx in range(int(document_match.group(1))):
+                body = bullets() if is_slides else paragraphs(word_count)
+                parts.append(f"=== SECTION {idx + 1} ===\n{body}")
+            return "\n\n".join(parts)
+
+        outline_match = re.search(r'Generate (\d+) (?:section|slide|sub-point) titles', prompt)
+        if outline_match:
+            return "\n".join(
+                f"{idx + 1}. {rng.choice(_STUB_WORDS).title()} {rng.choice(_STUB_WORDS).title()}"
+                for idx in range(int(outline_match.group(1)))
+            )
+
+        return bullets() if is_slides else paragraphs(word_count)
+
+    async def generate(self, prompt: str) -> LLMResponse:
+        self.calls += 1
+        self._in_flight += 1
+        started = time.monotonic()
+        try:
+            text = self.render(prompt)
+            output_tokens = estimate_tokens(text)
+            await asyncio.sleep(self._first_token_latency() + output_tokens / self.tokens_per_second)
+            self._maybe_fail()
+            return LLMResponse(text, estimate_tokens(prompt) + output_tokens)
+        finally:
+            self._in_flight -= 1
+            self.latency.record(time.monotonic() - started)
+
+    async def stream(self, prompt: str) -> AsyncIterator[Union[str, StreamEnd]]:
+        self.calls += 1
+        self._in_flight += 1
+        started = time.monotonic()
+        try:
+            text = self.render(prompt)
+            await asyncio.sleep(self._first_token_latency())
+            self._maybe_fail()
+
+            # Emit roughly five tokens per chunk at the configured token rate
+            pieces = re.findall(r'\S+\s*', text)
+            for idx in range(0, len(pieces), 4):
+                chunk = "".join(pieces[idx:idx + 4])
+                await asyncio.sleep(estimate_tokens(chunk) / self.tokens_per_second)
+                yield chunk
+            yield StreamEnd(estimate_tokens(prompt) + estimate_tokens(text))
+        finally:
+            self._in_flight -= 1
+            self.latency.record(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "stub",
+            "latency_distribution": self.latency_distribution,
+            "calls": self.calls,
+            "failures": self.failures,
+            "in_flight": self._in_flight,
+            "latency": self.latency.stats()
+        }
+
+def create_llm_backend(settings) -> LLMBackend:
+    """
+    Build the backend selected by settings.llm_backend
+    """
+    if settings.llm_backend == "gemini":
+        return GeminiBackend(
+            api_key=settings.gemini_api_key,
+            model_name=settings.gemini_model,
+            use_async=settings.gemini_use_async,
+            executor_workers=settings.gemini_executor_workers
+        )
+    if settings.llm_backend == "stub":
+        return StubBackend(
+            latency_distribution=settings.stub_latency_distribution,
+            latency_ms=settings.stub_latency_ms,
+            latency_jitter=settings.stub_latency_jitter,
+            tokens_per_second=settings.stub_tokens_per_second,
+            failure_rate=settings.stub_failure_rate,
+            failure_status=settings.stub_failure_status,
+            seed=settings.stub_seed
+        )
+    raise ValueError(f"Unknown LLM backend '{settings.llm_backend}'. Must be 'gemini' or 'stub'")
@@ -0,0 +1,109 @@
+from typing import Callable, Optional, TypeVar
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+T = TypeVar("T")
+
+class LatencyRecorder:
+    """
+    Thread-safe record of recent latencies with percentile lookups
+    """
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total_seconds += seconds
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Latency at `pct` (0-100) over the recent window, or None with no samples
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    def stats(self) -> dict:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "count": self.count,
+            "avg_ms": ms(self.total_seconds / self.count) if self.count else None,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99))
+        }
+
+class BoundedExecutor:
+    """
+    Dedicated thread pool for blocking LLM SDK calls
+
+    Keeps LLM concurrency off the event loop's default executor and
+    reports its own queue depth, active threads and latencies.
+    """
+    def __init__(self, max_workers: int, name: str = "llm"):
+        self.max_workers = max(1, max_workers)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self.queue_wait = LatencyRecorder()
+        self.run_time = LatencyRecorder()
+
+    async def run(self, fn: Callable[[], T]) -> T:
+        """
+        Run a blocking callable on the pool and await its result
+        """
+        submitted = time.monotonic()
+
+        def call():
+            started = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+            self.queue_wait.record(started - submitted)
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self._active -= 1
+                self.run_time.record(time.monotonic() - started)
+
+        with self._lock:
+            self._queued += 1
+        future = self._pool.submit(call)
+
+        def on_done(done):
+            # A call cancelled while still queued never ran, so never dequeued itself
+            if done.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+        future.add_done_callback(on_done)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            queued, active = self._queued, self._active
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": queued,
+            "active": active,
+            "queue_wait": self.queue_wait.stats(),
+            "run_time": self.run_time.stats()
+        }
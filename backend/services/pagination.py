@@ -0,0 +1,57 @@
+from typing import List, Optional, Tuple
+from datetime import datetime
+import base64
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+from config import get_settings
+
+settings = get_settings()
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+def page_size(limit: Optional[int]) -> int:
+    """
+    Requested page size, defaulted and clamped to the configured bounds
+    """
+    if limit is None:
+        return settings.page_size_default
+    return max(1, min(limit, settings.page_size_max))
+
+def paginate(query: Query, model, limit: int, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """
+    Newest-first page of `query` using keyset pagination on (created_at, id)
+
+    The cursor marks the last row of the previous page, so each page is a
+    bounded index range scan no matter how deep into the history it is.
+
+    Returns:
+        The page's rows and the cursor for the next page (None on the last page)
+
+    Raises:
+        InvalidCursor: The cursor is malformed
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
@@ -0,0 +1,89 @@
+from typing import NamedTuple, Optional
+import hashlib
+import secrets
+from config import get_settings
+from services.llm_cache import LRUCache
+
+settings = get_settings()
+
+class RefinementPreview(NamedTuple):
+    """A generated refinement waiting to be accepted or discarded"""
+    token: str
+    user_id: int
+    section_id: int
+    prompt: str
+    content_hash: str
+    refined_content: str
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class PreviewStore:
+    """
+    Server-side refinement previews, looked up by an opaque token
+
+    Accepting a preview only needs its token, so the refined text never
+    round-trips through the client. Re-previewing the same prompt on
+    unchanged content returns the stored preview instead of a new call.
+    Entries are bounded in number and expire after `ttl_seconds`.
+    """
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 1800):
+        self._previews = LRUCache(max_entries, ttl_seconds)
+        self._by_request = LRUCache(max_entries, ttl_seconds)
+        self.reused = 0
+
+    @staticmethod
+    def _request_key(user_id: int, section_id: int, section_hash: str, prompt: str) -> str:
+        return content_hash(f"{user_id}:{section_id}:{section_hash}:{prompt.strip()}")
+
+    def find(self, user_id: int, section_id: int, content: str, prompt: str) -> Optional[RefinementPreview]:
+        """
+        Stored preview of this prompt on exactly this content, if any
+        """
+        token = self._by_request.get(self._request_key(user_id, section_id, content_hash(content), prompt))
+        preview = self._previews.get(token) if token else None
+        if preview is not None:
+            self.reused += 1
+        return preview
+
+    def add(
+        self,
+        user_id: int,
+        section_id: int,
+        content: str,
+        prompt: str,
+        refined_content: str
+    ) -> RefinementPreview:
+        section_hash = content_hash(content)
+        preview = RefinementPreview(
+            token=secrets.token_urlsafe(24),
+            user_id=user_id,
+            section_id=section_id,
+            prompt=prompt,
+            content_hash=section_hash,
+            refined_content=refined_content
+        )
+        self._previews.set(preview.token, preview)
+        self._by_request.set(self._request_key(user_id, section_id, section_hash, prompt), preview.token)
+        return preview
+
+    def get(self, token: str) -> Optional[RefinementPreview]:
+        return self._previews.get(token)
+
+    def discard(self, preview: RefinementPreview):
+        self._previews.pop(preview.token)
+        self._by_request.pop(self._request_key(
+            preview.user_id, preview.section_id, preview.content_hash, preview.prompt
+        ))
+
+    def stats(self) -> dict:
+        return {
+            "previews": self._previews.stats(),
+            "reused": self.reused
+        }
+
+# Shared store for refine-preview / refine-accept
+refinement_previews = PreviewStore(
+    max_entries=settings.preview_max_entries,
+    ttl_seconds=settings.preview_ttl_seconds
+)
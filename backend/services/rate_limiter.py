@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate for budgeting (about 4 characters per token)
+    """
+    return len(text) // 4 + 1
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `capacity` units and refills
+    continuously at `refill_rate` units per second
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.available = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(
+            self.capacity,
+            self.available + (now - self._updated) * self.refill_rate
+        )
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """
+        Seconds until `amount` units can be taken from the bucket
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_rate
+
+    def consume(self, amount: float):
+        """
+        Take `amount` units; the balance may go negative to record debt
+        """
+        self._refill()
+        self.available -= amount
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter shared by all LLM calls
+
+    Callers are served strictly in arrival order: asyncio.Lock wakes waiters
+    FIFO, so a large request at the head of the queue cannot be starved by
+    a stream of small ones.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60)
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60)
+        self._lock = asyncio.Lock()
+        self._waiting = 0
+        self.total_wait_seconds = 0.0
+        self.total_acquired = 0
+
+    def _delay(self, tokens: int) -> float:
+        return max(self._requests.time_until(1), self._tokens.time_until(tokens))
+
+    async def acquire(self, tokens: int):
+        """
+        Wait until one request of roughly `tokens` tokens fits in both budgets
+
+        Args:
+            tokens: Estimated prompt + completion tokens for the request
+        """
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        break
+                    await asyncio.sleep(delay)
+                self._requests.consume(1)
+                self._tokens.consume(min(tokens, self._tokens.capacity))
+        finally:
+            self._waiting -= 1
+        self.total_acquired += 1
+        self.total_wait_seconds += time.monotonic() - started
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Correct the token budget once the real usage of a request is known
+        """
+        self._tokens.consume(actual_tokens - estimated_tokens)
+
+    def current_wait_time(self) -> float:
+        """
+        Estimated seconds a new caller would wait before being admitted
+        """
+        queued_requests = self._waiting + 1
+        request_wait = self._requests.time_until(0)
+        if queued_requests > self._requests.available:
+            request_wait = (queued_requests - self._requests.available) / self._requests.refill_rate
+        return max(request_wait, self._tokens.time_until(0))
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self._waiting,
+            "current_wait_seconds": round(self.current_wait_time(), 3),
+            "available_requests": round(self._requests.available, 2),
+            "available_tokens": round(self._tokens.available),
+            "total_acquired": self.total_acquired,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
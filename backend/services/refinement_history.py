@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional, Tuple
+from difflib import SequenceMatcher
+import json
+import re
+import zlib
+from sqlalchemy.orm import Session
+from config import get_settings
+from models import Refinement, Section
+
+settings = get_settings()
+
+# A word together with the whitespace after it, so joining tokens gives back the text exactly
+_TOKEN_PATTERN = re.compile(r'\S+\s*|\s+')
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text)
+
+def make_delta(base: str, target: str) -> str:
+    """
+    Encode `target` as token-level edits against `base`
+
+    The delta is a JSON list where a positive int copies that many tokens
+    from `base`, a negative int skips that many and a string is inserted.
+    """
+    base_tokens, target_tokens = tokenize(base), tokenize(target)
+    ops: List = []
+    matcher = SequenceMatcher(None, base_tokens, target_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append("".join(target_tokens[j1:j2]))
+    return json.dumps(ops, separators=(",", ":"))
+
+def apply_delta(base: str, delta: str) -> str:
+    tokens = tokenize(base)
+    parts, position = [], 0
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.extend(tokens[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+def pack(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 9)
+
+def unpack(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+def _keyframe_content(refinement: Refinement) -> str:
+    # Rows written before delta storage keep the full text uncompressed
+    if refinement.previous_content is not None:
+        return refinement.previous_content
+    return unpack(refinement.previous_delta)
+
+def _decode(chain: List[Refinement]) -> Dict[int, Tuple[str, str]]:
+    """
+    Rebuild (previous, new) content for a run of rows that starts at a keyframe
+    """
+    versions: Dict[int, Tuple[str, str]] = {}
+    last_new = ""
+    for refinement in chain:
+        if refinement.keyframe:
+            previous = _keyframe_content(refinement)
+        else:
+            previous = apply_delta(last_new, unpack(refinement.previous_delta))
+        if refinement.new_content is not None:
+            new = refinement.new_content
+        else:
+            new = apply_delta(previous, unpack(refinement.new_delta))
+        versions[refinement.id] = (previous, new)
+        last_new = new
+    return versions
+
+def _keyframe_id(db: Session, section_id: int, at_or_before: int) -> Optional[int]:
+    row = db.query(Refinement.id).filter(
+        Refinement.section_id == section_id,
+        Refinement.id <= at_or_before,
+        Refinement.keyframe.is_(True)
+    ).order_by(Refinement.id.desc()).first()
+    return row[0] if row else None
+
+def reconstruct(db: Session, section_id: int, refinements: List[Refinement]) -> Dict[int, Tuple[str, str]]:
+    """
+    Materialize the content of some of a section's refinements
+
+    Only the rows from the nearest keyframe before the earliest requested
+    refinement up to the latest one are loaded and decoded.
+
+    Returns:
+        (previous_content, new_content) by refinement id
+    """
+    if not refinements:
+        return {}
+    ids = [refinement.id for refinement in refinements]
+    start = _keyframe_id(db, section_id, min(ids))
+    chain = db.query(Refinement).filter(
+        Refinement.section_id == section_id,
+        Refinement.id >= (start if start is not None else min(ids)),
+        Refinement.id <= max(ids)
+    ).order_by(Refinement.id).all()
+    versions = _decode(chain)
+    return {refinement_id: versions[refinement_id] for refinement_id in ids}
+
+def record_refinement(db: Session, section: Section, prompt: str, new_content: str) -> Refinement:
+    """
+    Add a history row for replacing the section's current content with `new_content`
+
+    Rows are stored as zlib-compressed deltas: the previous content against
+    the prior row's result (usually empty, unless the section was edited by
+    hand in between) and the new content against the previous content.
+    Every `refinement_keyframe_interval` rows the previous content is stored
+    whole (still compressed) so reconstruction never walks a long chain.
+    """
+    previous_content = section.content or ""
+    refinement = Refinement(
+        prompt=prompt,
+        section_id=section.id,
+        content_size=len(new_content),
+        new_delta=pack(make_delta(previous_content, new_content))
+    )
+
+    latest = db.query(Refinement).filter(
+        Refinement.section_id == section.id
+    ).order_by(Refinement.id.desc()).first()
+    keyframe_id = _keyframe_id(db, section.id, latest.id) if latest else None
+    chain_length = 0
+    if keyframe_id is not None:
+        chain_length = db.query(Refinement).filter(
+            Refinement.section_id == section.id,
+            Refinement.id >= keyframe_id
+        ).count()
+
+    if keyframe_id is None or chain_length >= settings.refinement_keyframe_interval:
+        refinement.keyframe = True
+        refinement.previous_delta = pack(previous_content)
+    else:
+        _, last_new = reconstruct(db, section.id, [latest])[latest.id]
+        refinement.previous_delta = pack(make_delta(last_new, previous_content))
+
+    db.add(refinement)
+    return refinement
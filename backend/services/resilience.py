@@ -0,0 +1,151 @@
+from typing import Optional
+import asyncio
+import random
+import re
+import time
+
+# Upstream statuses worth retrying: timeouts, throttling and server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Statuses that mean the upstream itself is unhealthy (429 means it is up but busy)
+OUTAGE_STATUS_CODES = {500, 502, 503, 504}
+
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r'retry[_ ]delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+    re.compile(r'retry[- ]after:?\s*(\d+(?:\.\d+)?)', re.IGNORECASE),
+    re.compile(r'retry in (\d+(?:\.\d+)?)\s*s', re.IGNORECASE),
+]
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while the circuit breaker is open"""
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM service temporarily unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+def _status_code(exc: Exception) -> Optional[int]:
+    # LLMBackendError carries status_code; google.api_core errors carry the HTTP status as code
+    for attr in ("status_code", "code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+def is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return _status_code(exc) in RETRYABLE_STATUS_CODES
+
+def is_outage(exc: Exception) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    return _status_code(exc) in OUTAGE_STATUS_CODES
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """
+    Server-requested delay before retrying, if the error carries one
+    """
+    value = getattr(exc, "retry_after", None)
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    message = str(exc)
+    for pattern in _RETRY_AFTER_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter, never shorter than a server's retry-after
+    """
+    def __init__(self, max_attempts: int = 4, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.gave_up = 0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Delay before retry number `attempt` (0-based)
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def stats(self) -> dict:
+        return {
+            "max_attempts": self.max_attempts,
+            "retries": self.retries,
+            "gave_up": self.gave_up
+        }
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Stop calling the upstream after repeated outage errors
+
+    After `failure_threshold` consecutive outage failures the circuit opens
+    and calls fail immediately. Once `reset_seconds` have passed a single
+    trial call is let through; its result closes or re-opens the circuit.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not reach the upstream
+        """
+        if self.state == CIRCUIT_CLOSED:
+            return
+
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == CIRCUIT_OPEN and remaining <= 0:
+            self.state = CIRCUIT_HALF_OPEN
+
+        if self.state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError(max(remaining, 1.0))
+
+    def record_success(self):
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CIRCUIT_OPEN:
+                self.times_opened += 1
+            self.state = CIRCUIT_OPEN
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def abandon(self):
+        """
+        Forget a call that was cancelled before its outcome was known
+        """
+        self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,217 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import OrderedDict
+import asyncio
+from config import get_settings
+from services.gemini_service import gemini_service
+from services.generation_pipeline import build_outline_context, section_word_count
+from services.deadline import current_deadline
+
+settings = get_settings()
+
+SpeculationKey = Tuple[int, str, str]
+
+# A section slot in the outline: (position, title). Titles can repeat, and the
+# outline context a section is written with depends on its position.
+SlotKey = Tuple[int, str]
+
+class _Speculation:
+    def __init__(self):
+        self.tasks: Dict[SlotKey, asyncio.Task] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # Slots whose task got past the concurrency limit and is actually generating
+        self.running: Set[SlotKey] = set()
+
+class SpeculativeGenerator:
+    """
+    Pre-generate section content as soon as an outline is produced
+
+    Users usually create a project and generate right after getting an
+    outline, so content for its titles is started in the background, keyed
+    by user, topic and document type. Project generation adopts finished or
+    running results for sections with the same position and title. Unused
+    work is cancelled when it is superseded, evicted (at most `max_outlines`
+    kept) or after `ttl_seconds`.
+    Adoption waits only for work that is already running, and for at most
+    `adopt_wait_fraction` of the request's remaining budget.
+    """
+    def __init__(
+        self,
+        ttl_seconds: float = 120,
+        max_outlines: int = 50,
+        max_sections: int = 15,
+        concurrency: int = 4,
+        adopt_wait_fraction: float = 0.25
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_outlines = max(1, max_outlines)
+        self.max_sections = max_sections
+        self.adopt_wait_fraction = adopt_wait_fraction
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._entries: "OrderedDict[SpeculationKey, _Speculation]" = OrderedDict()
+        self.started = 0
+        self.adopted = 0
+        self.cancelled = 0
+        self.expired = 0
+
+    @staticmethod
+    def make_key(user_id: int, topic: str, document_type: str) -> SpeculationKey:
+        return (user_id, " ".join(topic.casefold().split()), document_type)
+
+    def start(self, user_id: int, topic: str, document_type: str, titles: List[str]):
+        """
+        Start generating content for an outline's sections in the background
+        """
+        key = self.make_key(user_id, topic, document_type)
+        self.discard(user_id, topic, document_type)
+        while len(self._entries) >= self.max_outlines:
+            _, oldest = self._entries.popitem(last=False)
+            self._cancel(oldest)
+
+        word_count = section_word_count(document_type)
+        entry = _Speculation()
+        for index, title in enumerate(titles[:self.max_sections]):
+            task = asyncio.ensure_future(self._generate(
+                entry, (index, title), topic, document_type, build_outline_context(titles, index), word_count
+            ))
+            # Nobody may ever await this task; don't let its failure be reported as unhandled
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            entry.tasks[(index, title)] = task
+
+        entry.timer = asyncio.get_event_loop().call_later(self.ttl_seconds, self._expire, key, entry)
+        self._entries[key] = entry
+        self.started += len(entry.tasks)
+
+    async def _generate(
+        self,
+        entry: _Speculation,
+        slot: SlotKey,
+        topic: str,
+        document_type: str,
+        context: str,
+        word_count: int
+    ) -> str:
+        async with self._semaphore:
+            entry.running.add(slot)
+            return await gemini_service.generate_section_content(
+                topic=topic,
+                section_title=slot[1],
+                document_type=document_type,
+                context=context,
+                word_count=word_count,
+                # Always new text, so adopting it is fine for fresh generations
+                use_cache=False
+            )
+
+    def _take(self, user_id: int, topic: str, document_type: str) -> Optional[_Speculation]:
+        entry = self._entries.pop(self.make_key(user_id, topic, document_type), None)
+        if entry is not None:
+            entry.timer.cancel()
+        return entry
+
+    def _cancel(self, entry: _Speculation, slots: Optional[List[SlotKey]] = None):
+        entry.timer.cancel()
+        for slot, task in entry.tasks.items():
+            if (slots is None or slot in slots) and not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def _expire(self, key: SpeculationKey, entry: _Speculation):
+        if self._entries.get(key) is entry:
+            del self._entries[key]
+            self.expired += 1
+            self._cancel(entry)
+
+    def discard(self, user_id: int, topic: str, document_type: str):
+        """
+        Cancel any speculative work for this outline
+        """
+        entry = self._take(user_id, topic, document_type)
+        if entry is not None:
+            self._cancel(entry)
+
+    async def adopt(
+        self,
+        user_id: int,
+        topic: str,
+        document_type: str,
+        titles: List[str],
+        indices: Optional[Iterable[int]] = None
+    ) -> Dict[int, str]:
+        """
+        Claim speculative content for a document's sections
+
+        A section matches speculative work for the same position and title
+        in the outline; `indices` limits which positions are wanted.
+
+        Only matches that are finished or already generating are waited
+        for, and no longer than `adopt_wait_fraction` of the current request
+        deadline; everything else, including matches still queued for the
+        concurrency limit, is cancelled so the caller generates it normally.
+
+        Args:
+            titles: Section titles of the document, in order
+            indices: Positions to claim (all by default)
+
+        Returns:
+            Content by section position, for the sections that were ready
+        """
+        entry = self._take(user_id, topic, document_type)
+        if entry is None:
+            return {}
+
+        wanted = {
+            (index, titles[index])
+            for index in (range(len(titles)) if indices is None else indices)
+        }
+        matched = {
+            slot: task for slot, task in entry.tasks.items()
+            if slot in wanted and (task.done() or slot in entry.running)
+        }
+        self._cancel(entry, [slot for slot in entry.tasks if slot not in matched])
+        if not matched:
+            return {}
+
+        adopted = {}
+        try:
+            deadline = current_deadline()
+            timeout = deadline.remaining() * self.adopt_wait_fraction if deadline else None
+            await asyncio.wait(matched.values(), timeout=timeout)
+            for (index, _), task in matched.items():
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    adopted[index] = task.result()
+        finally:
+            # Also reached when the request is cancelled (client disconnect) mid-wait;
+            # the entry is already gone, so nothing else would cancel these
+            for task in matched.values():
+                if not task.done():
+                    task.cancel()
+                    self.cancelled += 1
+        self.adopted += len(adopted)
+        return adopted
+
+    def shutdown(self):
+        while self._entries:
+            _, entry = self._entries.popitem()
+            self._cancel(entry)
+
+    def stats(self) -> dict:
+        return {
+            "outlines": len(self._entries),
+            "in_flight": sum(
+                1 for entry in self._entries.values()
+                for task in entry.tasks.values() if not task.done()
+            ),
+            "started": self.started,
+            "adopted": self.adopted,
+            "cancelled": self.cancelled,
+            "expired": self.expired
+        }
+
+# Shared speculative generator for outline -> project generation
+speculative_generations = SpeculativeGenerator(
+    ttl_seconds=settings.speculation_ttl_seconds,
+    max_outlines=settings.speculation_max_outlines,
+    max_sections=settings.speculation_max_sections,
+    concurrency=settings.speculation_concurrency,
+    adopt_wait_fraction=settings.speculation_adopt_wait_fraction
+)
@@ -0,0 +1,81 @@
+from typing import List, Optional
+from collections import Counter
+import re
+from config import get_settings
+
+settings = get_settings()
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+STOPWORDS = set("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just me more
+most my no nor not now of off on once only or other our ours out over own same she should so
+some such than that the their theirs them then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you
+your yours
+""".split())
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split content into sentences, treating each line (e.g. a bullet) as a break
+    """
+    sentences = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            sentences.extend(part.strip() for part in _SENTENCE_SPLIT.split(line) if part.strip())
+    return sentences
+
+def content_words(text: str) -> List[str]:
+    return [word for word in _WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def summarize(text: Optional[str], max_words: int = 40) -> str:
+    """
+    Extractive summary of a section: its most representative sentences, in order
+
+    Sentences are scored by how frequent their words are across the whole
+    section, so generic openings that share little with the rest of the
+    text lose out to sentences about the section's actual subject.
+    """
+    sentences = split_sentences(text or "")
+    if not sentences:
+        return ""
+
+    tokens = [content_words(sentence) for sentence in sentences]
+    frequency = Counter(word for words in tokens for word in words)
+
+    def score(index: int) -> float:
+        words = tokens[index]
+        if not words:
+            return 0.0
+        # Average rather than total so long sentences are not favoured
+        return sum(frequency[word] for word in words) / len(words)
+
+    ranked = sorted(range(len(sentences)), key=lambda idx: (-score(idx), idx))
+    chosen, used = [], 0
+    for index in ranked:
+        length = len(sentences[index].split())
+        if used + length > max_words and chosen:
+            continue
+        chosen.append(index)
+        used += length
+        if used >= max_words:
+            break
+
+    words = " ".join(sentences[idx] for idx in sorted(chosen)).split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "..."
+    return " ".join(words)
+
+def set_section_content(section, content: Optional[str]):
+    """
+    Replace a section's content together with its stored summary
+
+    Every write of section content goes through here so the summary used as
+    context for other sections never lags behind the text.
+    """
+    section.content = content
+    section.summary = summarize(content, settings.section_summary_max_words) if content else None
@@ -3,14 +3,20 @@ import apiClient from './client';
 export const generationApi = {
   // Generate content for entire project
   generateProject: async (projectId) => {
-    const response = await apiClient.post(`/generation/projects/${projectId}/generate`);
+    const response = await apiClient.post(
+      `/generation/projects/${projectId}/generate`,
+      null,
+      { params: { fresh: true } }
+    );
     return response.data;
   },
 
   // Regenerate content for specific section
   regenerateSection: async (projectId, sectionId) => {
     const response = await apiClient.post(
-      `/generation/projects/${projectId}/generate/${sectionId}`
+      `/generation/projects/${projectId}/generate/${sectionId}`,
+      null,
+      { params: { fresh: true } }
     );
     return response.data;
   },
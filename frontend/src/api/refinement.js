@@ -10,12 +10,11 @@ export const refinementApi = {
   },
 
   // Accept and save refinement - FIXED
-  acceptRefinement: async (sectionId, prompt, content) => {
+  acceptRefinement: async (sectionId, previewToken) => {
     const response = await apiClient.post(
       `/refinement/sections/${sectionId}/refine-accept`,
       {
-        prompt: prompt,
-        content: content
+        preview_token: previewToken
       }
     );
     return response.data;
@@ -29,9 +28,20 @@ export const refinementApi = {
     return response.data;
   },
 
-  // Get refinement history
-  getRefinements: async (sectionId) => {
-    const response = await apiClient.get(`/refinement/sections/${sectionId}/refinements`);
+  // Get a page of refinement history (view: 'full' or 'summary'), newest first
+  getRefinements: async (sectionId, view = 'summary', cursor = null) => {
+    const response = await apiClient.get(`/refinement/sections/${sectionId}/refinements`, {
+      params: cursor ? { view, cursor } : { view }
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null
+    };
+  },
+
+  // Get one refinement with its content
+  getRefinement: async (sectionId, refinementId) => {
+    const response = await apiClient.get(`/refinement/sections/${sectionId}/refinements/${refinementId}`);
     return response.data;
   },
 
@@ -44,9 +54,20 @@ export const refinementApi = {
     return response.data;
   },
 
-  // Get feedback
-  getFeedback: async (sectionId) => {
-    const response = await apiClient.get(`/refinement/sections/${sectionId}/feedback`);
+  // Get a page of feedback, newest first
+  getFeedback: async (sectionId, cursor = null) => {
+    const response = await apiClient.get(`/refinement/sections/${sectionId}/feedback`, {
+      params: cursor ? { cursor } : {}
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null
+    };
+  },
+
+  // Get like/dislike/comment totals for a section
+  getFeedbackSummary: async (sectionId) => {
+    const response = await apiClient.get(`/refinement/sections/${sectionId}/feedback/summary`);
     return response.data;
   },
 
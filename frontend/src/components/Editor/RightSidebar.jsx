@@ -13,10 +13,14 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
 
   // History
   const [refinementHistory, setRefinementHistory] = useState([]);
+  const [historyVersions, setHistoryVersions] = useState({});
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [loadingHistory, setLoadingHistory] = useState(false);
 
   // Comments
   const [comments, setComments] = useState([]);
+  const [commentsCursor, setCommentsCursor] = useState(null);
+  const [commentTotal, setCommentTotal] = useState(0);
   const [loadingComments, setLoadingComments] = useState(false);
 
   useEffect(() => {
@@ -33,8 +37,10 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
     
     setLoadingHistory(true);
     try {
-      const history = await refinementApi.getRefinements(section.id);
-      setRefinementHistory(history);
+      const page = await refinementApi.getRefinements(section.id, 'summary');
+      setRefinementHistory(page.items);
+      setHistoryCursor(page.nextCursor);
+      setHistoryVersions({});
     } catch (err) {
       console.error('Failed to load refinement history:', err);
     } finally {
@@ -42,17 +48,51 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
     }
   };
 
+  // Feedback pages mix likes/dislikes with comments, so keep paging until
+  // some comments turn up or the feedback runs out
+  const fetchComments = async (cursor) => {
+    let found = [];
+    let next = cursor;
+    do {
+      const page = await refinementApi.getFeedback(section.id, next);
+      found = found.concat(page.items.filter(f => f.comment && f.comment.trim() !== ''));
+      next = page.nextCursor;
+    } while (found.length === 0 && next);
+    return { found, next };
+  };
+
   const loadComments = async () => {
     if (!section) return;
     
     setLoadingComments(true);
     try {
-      const feedbacks = await refinementApi.getFeedback(section.id);
-      const commentsOnly = feedbacks.filter(f => f.comment && f.comment.trim() !== '');
-      setComments(commentsOnly);
+      const [{ found, next }, summary] = await Promise.all([
+        fetchComments(null),
+        refinementApi.getFeedbackSummary(section.id)
+      ]);
+      setComments(found);
+      setCommentsCursor(next);
+      setCommentTotal(summary.comment_count);
     } catch (err) {
       console.error('Failed to load comments:', err);
       setComments([]);
+      setCommentsCursor(null);
+      setCommentTotal(0);
+    } finally {
+      setLoadingComments(false);
+    }
+  };
+
+  const loadMoreComments = async () => {
+    if (!section || !commentsCursor) return;
+    
+    setLoadingComments(true);
+    try {
+      const { found, next } = await fetchComments(commentsCursor);
+      setComments(prev => [...prev, ...found]);
+      setCommentsCursor(next);
+    } catch (err) {
+      console.error('Failed to load comments:', err);
     } finally {
       setLoadingComments(false);
     }
@@ -85,8 +125,7 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
     try {
       await refinementApi.acceptRefinement(
         section.id,
-        refinementPrompt,
-        refinementPreview.refined_content
+        refinementPreview.preview_token
       );
       
       if (onManualUpdate) {
@@ -101,7 +140,7 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
         await loadRefinementHistory();
       }
     } catch (err) {
-      setError('Failed to accept refinement');
+      setError(err.response?.data?.detail || 'Failed to accept refinement');
     } finally {
       setIsSaving(false);
     }
@@ -112,6 +151,30 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
     setRefinementPreview(null);
   };
 
+  const loadMoreHistory = async () => {
+    if (!section || !historyCursor) return;
+    
+    setLoadingHistory(true);
+    try {
+      const page = await refinementApi.getRefinements(section.id, 'summary', historyCursor);
+      setRefinementHistory(prev => [...prev, ...page.items]);
+      setHistoryCursor(page.nextCursor);
+    } catch (err) {
+      console.error('Failed to load refinement history:', err);
+    } finally {
+      setLoadingHistory(false);
+    }
+  };
+
+  const loadVersion = async (refinement) => {
+    if (historyVersions[refinement.id]) {
+      return historyVersions[refinement.id];
+    }
+    const version = await refinementApi.getRefinement(section.id, refinement.id);
+    setHistoryVersions(prev => ({ ...prev, [refinement.id]: version }));
+    return version;
+  };
+
   const handleRestoreVersion = async (refinement) => {
     if (!section || !window.confirm('Restore this version? Current content will be replaced.')) {
       return;
@@ -119,12 +182,13 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
     
     setIsSaving(true);
     try {
+      const version = await loadVersion(refinement);
       await sectionsApi.updateSection(section.id, { 
-        content: refinement.previous_content 
+        content: version.previous_content 
       });
       
       if (onManualUpdate) {
-        onManualUpdate(section.id, { content: refinement.previous_content });
+        onManualUpdate(section.id, { content: version.previous_content });
       }
       
       await loadRefinementHistory();
@@ -182,7 +246,7 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
                   : 'text-mocha-subtext0 dark:text-mocha-subtext0 light:text-latte-subtext0 hover:text-mocha-text dark:hover:text-mocha-text light:hover:text-latte-text hover:bg-mocha-surface0 dark:hover:bg-mocha-surface0 light:hover:bg-latte-surface0'
               }`}
             >
-              💬 {comments.length > 0 && `(${comments.length})`}
+              💬 {commentTotal > 0 && `(${commentTotal})`}
             </button>
             <button
               onClick={() => onViewChange('history')}
@@ -244,7 +308,7 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
                       <div className="flex items-start justify-between mb-2">
                         <div className="flex items-center space-x-2">
                           <span className="text-sm font-semibold text-mocha-blue dark:text-mocha-blue light:text-latte-blue">
-                            Comment #{comments.length - index}
+                            Comment #{Math.max(commentTotal, comments.length) - index}
                           </span>
                           {comment.feedback_type && (
                             <span className={`px-2 py-0.5 text-xs font-medium rounded-full ${
@@ -265,6 +329,14 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
                       </p>
                     </div>
                   ))}
+                  {commentsCursor && (
+                    <button
+                      onClick={loadMoreComments}
+                      className="w-full py-2 text-sm text-mocha-blue dark:text-mocha-blue light:text-latte-blue hover:bg-mocha-surface0 dark:hover:bg-mocha-surface0 light:hover:bg-latte-surface0 rounded-lg transition-colors"
+                    >
+                      Load older comments
+                    </button>
+                  )}
                 </div>
               ) : (
                 <div className="text-center py-8 text-mocha-overlay0 dark:text-mocha-overlay0 light:text-latte-overlay0">
@@ -318,7 +390,14 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
                           "{refinement.prompt}"
                         </p>
                       </div>
-                      <details className="text-sm">
+                      <details
+                        className="text-sm"
+                        onToggle={(e) => {
+                          if (e.currentTarget.open) {
+                            loadVersion(refinement).catch(() => setError('Failed to load version'));
+                          }
+                        }}
+                      >
                         <summary className="cursor-pointer text-mocha-mauve dark:text-mocha-mauve light:text-latte-mauve hover:text-mocha-lavender dark:hover:text-mocha-lavender light:hover:text-latte-lavender font-medium">
                           View previous content
                         </summary>
@@ -327,12 +406,20 @@ const RightSidebar = ({ isOpen, onToggle, view, onViewChange, section, onRefine,
                             Previous Version:
                           </p>
                           <p className="text-mocha-text dark:text-mocha-text light:text-latte-text whitespace-pre-wrap text-xs">
-                            {refinement.previous_content}
+                            {historyVersions[refinement.id]?.previous_content ?? 'Loading...'}
                           </p>
                         </div>
                       </details>
                     </div>
                   ))}
+                  {historyCursor && (
+                    <button
+                      onClick={loadMoreHistory}
+                      className="w-full py-2 text-sm text-mocha-mauve dark:text-mocha-mauve light:text-latte-mauve hover:bg-mocha-surface0 dark:hover:bg-mocha-surface0 light:hover:bg-latte-surface0 rounded-lg transition-colors"
+                    >
+                      Load older refinements
+                    </button>
+                  )}
                 </div>
               ) : (
                 <div className="text-center py-8 text-mocha-overlay0 dark:text-mocha-overlay0 light:text-latte-overlay0">
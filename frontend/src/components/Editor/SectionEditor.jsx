@@ -47,14 +47,15 @@ const SectionEditor = ({ section, documentType, onRefine, onFeedback, onManualUp
 
   const loadFeedback = async () => {
     try {
-      const feedbacks = await refinementApi.getFeedback(section.id);
-      console.log(feedbacks);
+      // Find latest feedback with type, paging back past comment-only entries
+      let latestWithType = null;
+      let cursor = null;
+      do {
+        const page = await refinementApi.getFeedback(section.id, cursor);
+        latestWithType = page.items.find(f => f.feedback_type) || null;
+        cursor = page.nextCursor;
+      } while (!latestWithType && cursor);
       
-      // Count total comments
-      const totalComments = feedbacks.filter(f => f.comment && f.comment.trim() !== '').length;
-      
-      // Find latest feedback with type
-      const latestWithType = feedbacks.find(f => f.feedback_type);
       if (latestWithType) {
         setFeedbackType(latestWithType.feedback_type);
       } else {